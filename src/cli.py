@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: cli.py
+Description: Command line entry point to analyse videos without the GUI, on one or several machines sharing a filesystem.
+Author: Maxime Gosselin
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import argparse
+import sys
+
+# Only the service client is imported up front: when the analysis service is running,
+# `analyse` never loads OpenCV, pandas or openpyxl. The other modules are imported
+# where they are needed.
+from controller.service_client import AnalysisClient, ServiceUnavailable, DEFAULT_HOST, DEFAULT_PORT
+from processing.settings_manager import load_analysis_options, load_export_options
+
+
+def parse_excel_pairs(pairs):
+    """Convert "VIDEO=WORKBOOK" arguments into a dictionary."""
+    excels = {}
+    for pair in pairs or []:
+        video, sep, excel = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected VIDEO=WORKBOOK, got: {pair}")
+        excels[video] = excel
+    return excels
+
+
+def print_warnings(jobs):
+    """Print the reference Excel errors recorded with the finished jobs."""
+    for job in jobs:
+        if job["status"] == "done" and job["warnings"]:
+            for warning in job["warnings"].splitlines():
+                print(f"Job {job['id']} warning ({job['video']}): {warning}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bubble Video Analyzer - command line")
+    parser.add_argument("--db", default="jobs.db", help="SQLite job database, shared by all workers")
+    parser.add_argument("--results", default="results/jobs", help="Shared directory for per-video results")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add videos to the job queue")
+    enqueue.add_argument("videos", nargs="+")
+    enqueue.add_argument("--excel", action="append", metavar="VIDEO=WORKBOOK",
+                         help="Reference Excel file of a video (repeatable)")
+    enqueue.add_argument("--step", type=int, default=1)
+    enqueue.add_argument("--scale", type=float, default=1.0)
+    enqueue.add_argument("--agitation", type=int, default=0)
+
+    worker = commands.add_parser("worker", help="Process jobs until the queue is empty "
+                                                "(run it from the directory holding settings.json)")
+    worker.add_argument("--wait", action="store_true", help="Keep waiting for new jobs")
+    worker.add_argument("--lease", type=float, default=300, help="Lease duration in seconds")
+
+    assemble = commands.add_parser("assemble", help="Build the Excel workbook from finished jobs")
+    assemble.add_argument("output", help="Output .xlsx file name")
+    assemble.add_argument("--partial", action="store_true",
+                          help="Assemble the finished jobs even if other jobs are not done")
+
+    commands.add_parser("status", help="Show the number of jobs per status")
+
+    serve = commands.add_parser("serve", help="Run the local analysis service used by the GUI "
+                                              "(run it from the directory holding settings.json)")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--jobs", type=int, default=1, help="Number of analyses run concurrently")
+
+    analyse = commands.add_parser("analyse", help="Analyse videos and export the workbook, "
+                                                  "through the local service when it is running")
+    analyse.add_argument("videos", nargs="+")
+    analyse.add_argument("--excel", action="append", metavar="VIDEO=WORKBOOK",
+                         help="Reference Excel file of a video (repeatable)")
+    analyse.add_argument("--step", type=int, default=1)
+    analyse.add_argument("--scale", type=float, default=1.0)
+    analyse.add_argument("--agitation", type=int, default=0)
+    analyse.add_argument("--output", default="resultats.xlsx", help="Output .xlsx file name")
+    analyse.add_argument("--update", action="store_true", help="Only analyse new or changed videos")
+    analyse.add_argument("--sweep", action="store_true",
+                         help="Export one workbook per threshold configured in settings.json")
+    analyse.add_argument("--no-service", action="store_true", help="Always analyse in this process")
+    return parser
+
+
+def run_analyse(args):
+    """
+    Analyse videos from the command line, reporting progress on stdout.
+
+    The job is sent to the local analysis service as is; the videos are only opened,
+    and the analysis modules imported, when the job has to run in this process.
+    """
+    excels = parse_excel_pairs(args.excel)
+
+    def progress(index, total, video_path):
+        print(f"[{index + 1}/{total}] {video_path}", flush=True)
+
+    if not args.no_service:
+        client = AnalysisClient()
+        videos = {video: excels.get(video) for video in dict.fromkeys(args.videos)}
+        request = client.build_request(videos, args.step, args.scale, args.output, args.agitation,
+                                       update=args.update, sweep=args.sweep)
+        try:
+            return client.run(request, progress)
+        except ServiceUnavailable:
+            pass
+
+    from controller.controller import VideoAnalyzerController
+    controller = VideoAnalyzerController(use_service=False)
+    for video in args.videos:
+        controller.handle_add_video(video)
+        if video in excels:
+            controller.model.attach_excel(video, excels[video])
+    return controller.run_analysis(args.step, args.scale, args.output, args.agitation,
+                                   update=args.update, progress=progress, sweep=args.sweep)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        from controller.analysis_service import AnalysisService
+        service = AnalysisService(port=args.port, max_jobs=args.jobs)
+        print(f"Analysis service listening on {DEFAULT_HOST}:{args.port}", flush=True)
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == "analyse":
+        print(f"Saved to: {run_analyse(args)}")
+        return 0
+
+    from model.batch_model import BatchModel
+    batch = BatchModel(args.db, args.results)
+
+    if args.command == "enqueue":
+        excels = parse_excel_pairs(args.excel)
+        options = load_analysis_options()
+        options.pop("thresholds", None)
+        for video in args.videos:
+            job_id = batch.enqueue(video, excels.get(video), args.step, args.scale, args.agitation, **options)
+            print(f"Job {job_id}: {video}")
+    elif args.command == "worker":
+        processed = batch.run_worker(lease_seconds=args.lease, wait=args.wait)
+        print(f"{processed} job(s) processed")
+    elif args.command == "assemble":
+        for job in batch.unfinished_jobs() if args.partial else []:
+            print(f"Skipping job {job['id']} ({job['status']}): {job['video']}")
+        print(f"Saved to: {batch.assemble(args.output, partial=args.partial, **load_export_options())}")
+        print_warnings(batch.queue.jobs())
+    elif args.command == "status":
+        jobs = batch.queue.jobs()
+        for status, count in sorted(batch.queue.counts().items()):
+            print(f"{status}: {count}")
+        for job in jobs:
+            if job["status"] == "failed":
+                print(f"Job {job['id']} failed ({job['video']}): {job['error']}")
+        print_warnings(jobs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: analysis_service.py
+Description: This module implements a long-running local analysis service that keeps the analysis libraries loaded and a worker pool warm between runs.
+Author: Maxime Gosselin
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+
+import itertools
+import json
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from controller.controller import VideoAnalyzerController
+from controller.service_client import DEFAULT_HOST, DEFAULT_PORT
+from processing.image_analyser import analyse_image
+
+MAX_KEPT_JOBS = 100
+
+
+def is_plain_filename(name):
+    """
+    Check that a results file name cannot point outside the results folder.
+
+    Args:
+        name: Requested output file name.
+
+    Returns:
+        bool: True for a non-empty name without "..", path separator or drive (":").
+    """
+    if not isinstance(name, str) or not name:
+        return False
+    forbidden = {"/", "\\", ":", os.sep, os.altsep} - {None}
+    return ".." not in name and not any(part in name for part in forbidden)
+
+
+class AnalysisService:
+    """
+    Local analysis daemon reachable over localhost HTTP.
+
+    Libraries (OpenCV, pandas, openpyxl) are imported once at startup and jobs run on
+    a persistent thread pool, so repeated short analyses do not pay the start-up cost.
+    Each job runs a headless controller; its progress is published as a stream of
+    JSON events. Jobs are only accepted from clients sharing the service working
+    directory, since settings and results are resolved relative to it.
+
+    Endpoints:
+        GET  /health              Service status.
+        POST /jobs                Submit a job, returns {"id": ...}.
+        GET  /jobs/<id>/events    Newline-delimited JSON events until the job ends.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_jobs=1):
+        """
+        Initialize the service.
+
+        Args:
+            host (str): Address to listen on (localhost only by default).
+            port (int): Port to listen on.
+            max_jobs (int): Number of jobs run concurrently by the worker pool.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_jobs)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.server = ThreadingHTTPServer((host, port), _ServiceHandler)
+        self.server.service = self
+
+    def warm_up(self):
+        """Run a tiny analysis so that the first real job does not pay lazy initialisations."""
+        analyse_image(np.zeros((64, 64, 3), dtype=np.uint8))
+        self.executor.submit(lambda: None).result()
+
+    def serve_forever(self):
+        """Warm up the service then handle requests until interrupted."""
+        self.warm_up()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.executor.shutdown(wait=False)
+
+    def submit(self, request):
+        """
+        Queue a job on the worker pool.
+
+        Args:
+            request (dict): Payload built by `AnalysisClient.build_request`.
+
+        Returns:
+            int: Identifier of the job.
+        """
+        job_id = next(self.ids)
+        job = {"events": [], "finished": False, "condition": threading.Condition()}
+        with self.lock:
+            self.jobs[job_id] = job
+            finished = [key for key, value in self.jobs.items() if value["finished"]]
+            for key in finished[:max(0, len(self.jobs) - MAX_KEPT_JOBS)]:
+                del self.jobs[key]
+        self.executor.submit(self._run, job, request)
+        return job_id
+
+    def events(self, job_id):
+        """
+        Yield the events of a job, waiting for new ones until the job ends.
+
+        Raises:
+            KeyError: If the job is unknown.
+        """
+        with self.lock:
+            job = self.jobs[job_id]
+        sent = 0
+        while True:
+            with job["condition"]:
+                while sent >= len(job["events"]) and not job["finished"]:
+                    job["condition"].wait()
+                pending = job["events"][sent:]
+                finished = job["finished"]
+            for event in pending:
+                yield event
+            sent += len(pending)
+            if finished and sent >= len(job["events"]):
+                return
+
+    def _publish(self, job, event, finished=False):
+        with job["condition"]:
+            job["events"].append(event)
+            job["finished"] = job["finished"] or finished
+            job["condition"].notify_all()
+
+    def _run(self, job, request):
+        """Run a job with a headless controller and publish its progress and result."""
+        def progress(index, total, video_path):
+            self._publish(job, {"type": "progress", "index": index, "total": total, "video": video_path})
+
+        try:
+            controller = VideoAnalyzerController(use_service=False)
+            for video_path, excel_path in request["videos"]:
+                controller.handle_add_video(video_path)
+                if excel_path:
+                    controller.model.attach_excel(video_path, excel_path)
+            result = controller.run_analysis(request["step"], request["scale"], request["output_filename"],
+                                             request["agitation"], update=request.get("update", False),
+                                             progress=progress, sweep=request.get("sweep", False))
+            self._publish(job, {"type": "done", "result": result}, finished=True)
+        except Exception as e:
+            self._publish(job, {"type": "error", "message": str(e)}, finished=True)
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0: the event stream ends when the connection is closed
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        service = self.server.service
+        parts = self.path.strip("/").split("/")
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok", "cwd": os.getcwd()})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and parts[1].isdigit():
+            try:
+                events = service.events(int(parts[1]))
+                first = next(events, None)
+            except KeyError:
+                self._send_json(404, {"error": "unknown job"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            if first is not None:
+                self._write_event(first)
+                for event in events:
+                    self._write_event(event)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if os.path.abspath(request.get("cwd", "")) != os.getcwd():
+            self._send_json(409, {"error": "the service runs in another working directory"})
+            return
+        if not is_plain_filename(request.get("output_filename")):
+            self._send_json(400, {"error": "output_filename must be a file name inside results/"})
+            return
+        self._send_json(200, {"id": self.server.service.submit(request)})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_event(self, event):
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
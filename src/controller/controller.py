@@ -10,6 +10,8 @@ License: MIT License
 
 from model.video_model import VideoModel
 from model.export_model import ExportModel
+from controller.service_client import AnalysisClient, ServiceUnavailable
+from processing.settings_manager import load_analysis_options, load_export_options
 from pathlib import Path
 
  
@@ -21,18 +23,22 @@ class VideoAnalyzerController:
     Handles user actions such as adding videos, attaching Excel files, and launching analysis.
     """
 
-    def __init__(self, view):
+    def __init__(self, view=None, use_service=True):
         """
         Initialize the controller with the given view.
 
         Args:
-            view (VideoAnalyzerUI): The graphical user interface instance.
+            view (VideoAnalyzerUI, optional): The graphical user interface instance, None when headless.
+            use_service (bool, optional): Submit analyses to the local analysis service when it is running.
         """
         self.view = view
         self.model = VideoModel()
         self.exporter = ExportModel()
+        self.live_path = None
+        self.client = AnalysisClient() if use_service else None
 
-        self.connect_signals()
+        if view is not None:
+            self.connect_signals()
 
     def connect_signals(self):
         """
@@ -41,7 +47,12 @@ class VideoAnalyzerController:
         self.view.on_add_video = self.handle_add_video
         self.view.on_remove_video = self.handle_remove_video
         self.view.on_attach_excel = self.handle_attach_excel
+        self.view.on_get_frame = self.handle_get_frame
+        self.view.on_frame_count = self.handle_frame_count
         self.view.on_analyze = self.handle_analyze
+        self.view.on_live_start = self.handle_live_start
+        self.view.on_live_poll = self.handle_live_poll
+        self.view.on_live_stop = self.handle_live_stop
 
     def handle_add_video(self, file_path):
         """
@@ -70,6 +81,8 @@ class VideoAnalyzerController:
         """
         keys = list(self.model.videos_data.keys())
         if 0 <= index < len(keys):
+            if keys[index] == self.live_path:
+                self.live_path = None
             self.model.remove_video(keys[index])
             return True
         return False
@@ -92,19 +105,231 @@ class VideoAnalyzerController:
             return f"{Path(keys[index]).name} (frames: {frames}) - file loaded"
         return None
 
-    def handle_analyze(self, step, scale, output_filename, agitation):
+    def handle_get_frame(self, index, frame_number):
+        """
+        Handle a request for a single frame of a loaded video (scale selection, previews).
+
+        Args:
+            index (int): Index of the video in the list.
+            frame_number (int): Index of the frame in the video.
+
+        Returns:
+            np.ndarray: The decoded frame, or None if the video index is invalid.
+        """
+        keys = list(self.model.videos_data.keys())
+        if 0 <= index < len(keys):
+            return self.model.get_frame(keys[index], frame_number)
+        return None
+
+    def handle_frame_count(self, index):
+        """
+        Handle a request for the number of frames of a loaded video.
+
+        Args:
+            index (int): Index of the video in the list.
+
+        Returns:
+            int: Number of frames reported by the video, or 0 if the video index is invalid.
+        """
+        keys = list(self.model.videos_data.keys())
+        if 0 <= index < len(keys):
+            return self.model.videos_data[keys[index]]["frame"]
+        return 0
+
+    def handle_analyze(self, step, scale, output_filename, agitation, update=False, progress=None, sweep=False):
         """
         Handle the action of starting the video analysis.
 
+        The job is submitted to the local analysis service when it is running, and run
+        in-process otherwise. Videos followed live are always analysed in-process so that
+        their results can be reused.
+
         Args:
             step (int): Frame step interval for analysis.
             scale (float): Pixel-to-centimeter conversion scale.
             output_filename (str): Name of the output Excel file.
             agitation (int): Number of initial frames to ignore.
+            update (bool): Update the existing workbook, analysing only new or changed videos.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+            sweep (bool): Run the threshold sweep configured in the parameters instead of a single analysis.
 
         Returns:
             str: Path to the generated Excel file.
         """
-        data_frames, param_excels = self.model.analyze_all(step, scale, agitation)
-        output_path = self.exporter.export_results(output_filename, data_frames, param_excels)
+        has_live = any(info.get("live") is not None for info in self.model.videos_data.values())
+        if self.client is not None and not has_live:
+            videos = {path: info["excel"] for path, info in self.model.videos_data.items()}
+            request = self.client.build_request(videos, step, scale, output_filename, agitation, update, sweep)
+            try:
+                return self.client.run(request, progress)
+            except ServiceUnavailable:
+                pass
+        return self.run_analysis(step, scale, output_filename, agitation, update, progress, sweep)
+
+    def run_analysis(self, step, scale, output_filename, agitation, update=False, progress=None, sweep=False):
+        """
+        Run the analysis and the export in-process.
+
+        Args:
+            step (int): Frame step interval for analysis.
+            scale (float): Pixel-to-centimeter conversion scale.
+            output_filename (str): Name of the output Excel file.
+            agitation (int): Number of initial frames to ignore.
+            update (bool): Update the existing workbook, analysing only new or changed videos.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+            sweep (bool): Run the threshold sweep configured in the parameters instead of a single analysis.
+
+        Returns:
+            str: Path to the generated Excel file.
+
+        Raises:
+            ValueError: If a sweep is requested with `update` or without configured thresholds.
+        """
+        options = load_analysis_options()
+        thresholds = options.pop("thresholds", None)
+        if sweep:
+            if update:
+                raise ValueError("A threshold sweep writes one new workbook per threshold, it cannot update a workbook.")
+            if not thresholds:
+                raise ValueError("No sweep thresholds configured in the parameters.")
+            return self.export_sweep(step, scale, output_filename, agitation, thresholds, options, progress)
+        if update:
+            return self.update_export(step, scale, output_filename, agitation, options, progress)
+
+        video_paths = list(self.model.videos_data.keys())
+        sources = [self.model.source_info(path, step, scale, agitation, **options) for path in video_paths]
+        data_frames, param_excels = self.model.analyze_all(step, scale, agitation, progress=progress, **options)
+        output_path = self.exporter.export_results(output_filename, data_frames, param_excels,
+                                                   sources=sources, **load_export_options())
+        return self.with_reports(output_path)
+
+    def update_export(self, step, scale, output_filename, agitation, options, progress=None):
+        """
+        Update an existing workbook: only new or changed videos are analysed and written,
+        then the summary sheet and charts are rebuilt.
+
+        Args:
+            step (int): Frame step interval for analysis.
+            scale (float): Pixel-to-centimeter conversion scale.
+            output_filename (str): Name of the Excel file to update.
+            agitation (int): Number of initial frames to ignore.
+            options (dict): Additional analysis options.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+
+        Returns:
+            str: Path to the updated Excel file.
+        """
+        sources = {path: self.model.source_info(path, step, scale, agitation, **options)
+                   for path in self.model.videos_data}
+        plan = self.exporter.plan_update(output_filename, sources)
+
+        video_paths = list(plan.keys())
+        data_frames, param_excels = self.model.analyze_all(step, scale, agitation, video_paths=video_paths,
+                                                           progress=progress, **options)
+        updates = {
+            plan[path]: (df, df_param, sources[path])
+            for path, df, df_param in zip(video_paths, data_frames, param_excels)
+        }
+        output_path = self.exporter.update_results(output_filename, updates, **load_export_options())
+        return self.with_reports(output_path)
+
+    def with_reports(self, output_path):
+        """
+        Append the number of near-duplicate frames whose statistics were reused and the
+        errors met while reading the reference Excel files to the output path.
+
+        Args:
+            output_path (str): Path to the generated Excel file(s).
+
+        Returns:
+            str: The path, followed by the reuse report and the Excel errors of each video, if any.
+        """
+        frames = sum(report["frames"] for report in self.model.reuse_report.values())
+        reused = sum(report["reused"] for report in self.model.reuse_report.values())
+        if reused:
+            output_path = f"{output_path} ({reused}/{frames} near-duplicate frames reused)"
+        for video_path, errors in self.model.reference_errors.items():
+            output_path += f"\nExcel errors for {Path(video_path).name}: {'; '.join(errors)}"
         return output_path
+
+    def export_sweep(self, step, scale, output_filename, agitation, thresholds, options, progress=None):
+        """
+        Analyse every video once for several thresholds and export one workbook per threshold.
+
+        Args:
+            step (int): Frame step interval for analysis.
+            scale (float): Pixel-to-centimeter conversion scale.
+            output_filename (str): Name of the output Excel file, suffixed with each threshold.
+            agitation (int): Number of initial frames to ignore.
+            thresholds (list): Fixed threshold values, "otsu" or "adaptive".
+            options (dict): Additional analysis options.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+
+        Returns:
+            str: Comma-separated paths of the generated Excel files.
+        """
+        # The change detector compares binarised frames, it does not apply across thresholds
+        options.pop("change_tolerance", None)
+        video_paths = list(self.model.videos_data.keys())
+        sweeps = self.model.analyze_sweep(step, scale, agitation, thresholds, progress=progress, **options)
+        stem = Path(output_filename).stem
+        output_paths = []
+        for label, (data_frames, param_excels) in sweeps.items():
+            sources = [self.model.source_info(path, step, scale, agitation, threshold=label, **options)
+                       for path in video_paths]
+            output_paths.append(self.exporter.export_results(f"{stem}_seuil_{label}.xlsx", data_frames,
+                                                             param_excels, sources=sources,
+                                                             **load_export_options()))
+        return self.with_reports(", ".join(output_paths))
+
+    def handle_live_start(self, file_path, step, scale, agitation):
+        """
+        Handle the action of following a recording while it is being acquired.
+
+        Args:
+            file_path (str): Path to the growing video file or image directory.
+            step (int): Frame step interval for analysis.
+            scale (float): Pixel-to-centimeter conversion scale.
+            agitation (int): Number of initial frames to ignore.
+
+        Returns:
+            str: A display string for the recording if it was not already listed, None otherwise.
+        """
+        if self.live_path is not None:
+            self.handle_live_stop()
+
+        is_new = file_path not in self.model.videos_data
+        self.model.start_live(file_path, step, scale, agitation)
+        self.live_path = file_path
+        if is_new:
+            return f"{Path(file_path).name} (live) - excel not loaded"
+        return None
+
+    def handle_live_poll(self):
+        """
+        Handle a periodic refresh of the live analysis.
+
+        Frames are analysed in a background thread; this only collects the new results.
+
+        Returns:
+            list: Results of the frames analysed since the previous call.
+        """
+        if self.live_path is None:
+            return []
+        return self.model.videos_data[self.live_path]["live"].take_new_results()
+
+    def handle_live_stop(self):
+        """
+        Handle the end of the live analysis. Computed results are kept for the final export.
+
+        Returns:
+            tuple or None: (index, display string) of the followed recording, None if nothing was followed.
+        """
+        if self.live_path is None:
+            return None
+        file_path, self.live_path = self.live_path, None
+        frames = self.model.stop_live(file_path)
+        info = self.model.videos_data[file_path]
+        index = list(self.model.videos_data.keys()).index(file_path)
+        excel_status = "file loaded" if info["excel"] else "excel not loaded"
+        return index, f"{Path(file_path).name} (frames: {frames}) - {excel_status}"
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: service_client.py
+Description: This module implements the client of the local analysis service, used by the GUI controller and the command line to submit analyses to a warm daemon.
+Author: Maxime Gosselin
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+
+import json
+import os
+from http.client import HTTPConnection
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CONNECT_TIMEOUT = 1.0
+
+
+class ServiceUnavailable(Exception):
+    """Raised when the analysis service is not running or cannot handle the request."""
+
+
+class AnalysisClient:
+    """
+    Client of the local analysis service.
+
+    Submits an analysis job over localhost HTTP and streams its progress back.
+    Callers fall back to in-process execution when `ServiceUnavailable` is raised.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Initialize the client.
+
+        Args:
+            host (str): Address the service listens on.
+            port (int): Port the service listens on.
+        """
+        self.host = host
+        self.port = port
+
+    def build_request(self, videos, step, scale, output_filename, agitation, update=False, sweep=False):
+        """
+        Build the payload of an analysis job.
+
+        Args:
+            videos (dict): Mapping from video path to its attached Excel file (or None).
+            step (int): Frame step interval for analysis.
+            scale (float): Pixel-to-centimeter conversion scale.
+            output_filename (str): Name of the output Excel file.
+            agitation (int): Number of initial frames to ignore.
+            update (bool): Update the existing workbook instead of re-exporting it.
+            sweep (bool): Run the threshold sweep configured in the parameters.
+
+        Returns:
+            dict: The job payload.
+        """
+        return {
+            "cwd": os.getcwd(),
+            "videos": [[path, excel] for path, excel in videos.items()],
+            "step": step,
+            "scale": scale,
+            "agitation": agitation,
+            "output_filename": output_filename,
+            "update": update,
+            "sweep": sweep,
+        }
+
+    def run(self, request, progress=None):
+        """
+        Submit a job to the service and wait for its result.
+
+        Args:
+            request (dict): Payload built by `build_request`.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+
+        Returns:
+            str: The result message of the job (path to the generated Excel file).
+
+        Raises:
+            ServiceUnavailable: If the service is not running or cannot run the job (other working directory).
+            ValueError: If the service rejected the request itself (e.g. an invalid output file name).
+            RuntimeError: If the analysis failed in the service.
+        """
+        try:
+            conn = HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            conn.request("POST", "/jobs", body=json.dumps(request), headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            body = json.loads(response.read() or b"{}")
+            conn.close()
+        except (OSError, ValueError) as e:
+            raise ServiceUnavailable(str(e))
+        if response.status == 400:
+            raise ValueError(body.get("error", "invalid request"))
+        if response.status != 200:
+            raise ServiceUnavailable(body.get("error", f"HTTP {response.status}"))
+
+        # No timeout on the event stream: a single video can take minutes to analyse
+        conn = HTTPConnection(self.host, self.port)
+        try:
+            conn.request("GET", f"/jobs/{body['id']}/events")
+            for line in conn.getresponse():
+                event = json.loads(line)
+                if event["type"] == "progress":
+                    if progress:
+                        progress(event["index"], event["total"], event["video"])
+                elif event["type"] == "done":
+                    return event["result"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["message"])
+        finally:
+            conn.close()
+        raise RuntimeError("The analysis service closed the connection before the end of the job.")
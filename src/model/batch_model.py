@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: batch_model.py
+Description: This module defines the BatchModel class used to distribute video analyses over several headless workers through a shared job queue in the Bubble Video Analyzer application.
+Author: Maxime Gosselin
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+
+import os
+import json
+import socket
+import threading
+import time
+import pandas as pd
+from pathlib import Path
+from model.video_model import VideoModel
+from model.export_model import ExportModel
+from processing.job_queue import JobQueue, LEASE_SECONDS
+from processing.settings_manager import load_settings
+
+POLL_INTERVAL = 5
+
+
+class BatchModel:
+    """
+    Distributes video analyses over workers sharing a filesystem.
+
+    The coordinator enqueues one job per video into a SQLite database. Workers claim
+    jobs with a lease, write one result file per video into a shared directory, and
+    the coordinator finally assembles the Excel workbook from the finished jobs.
+    """
+
+    def __init__(self, db_path, results_dir):
+        """
+        Initialize the batch model.
+
+        Args:
+            db_path (str): Path to the SQLite job database, on a filesystem shared by all workers.
+            results_dir (str): Shared directory receiving the per-video results.
+        """
+        self.queue = JobQueue(db_path)
+        self.results_dir = Path(results_dir)
+
+    def enqueue(self, video_path, excel_path, step, scale, agitation, **options):
+        """
+        Add the analysis of one video to the queue.
+
+        Paths are stored as absolute paths, and the Excel column selection of the
+        settings is stored with the job so that every worker merges the same columns.
+
+        Args:
+            video_path (str): Path to the video file, on a filesystem shared by the workers.
+            excel_path (str or None): Path to the reference Excel file, if any.
+            step (int): Interval between analyzed frames (1 = every frame).
+            scale (float): Pixel to centimeter conversion factor.
+            agitation (int): Number of frames to skip at the beginning.
+            **options: Additional keyword arguments forwarded to `analyse_video`.
+
+        Returns:
+            int: Identifier of the job.
+        """
+        params = {"step": step, "scale": scale, "agitation": agitation,
+                  "columns": load_settings().get("columns", {}), **options}
+        excel_path = os.path.abspath(excel_path) if excel_path else None
+        return self.queue.enqueue(os.path.abspath(video_path), excel_path, params)
+
+    def run_job(self, job):
+        """
+        Analyse the video of a job and write its results.
+
+        Results are written as JSON to a temporary file then renamed, so that a crashed
+        worker never leaves a partial result behind. The source of the video (as recorded
+        in the "Sources" sheet) is written alongside, describing the file actually analysed.
+
+        Args:
+            job (dict): The job returned by `JobQueue.claim`.
+
+        Returns:
+            tuple: (path to the per-video result file, list of errors met while reading
+                the reference Excel file).
+        """
+        params = dict(job["params"])
+        model = VideoModel(columns=params.pop("columns", None))
+        model.add_video(job["video"])
+        if job["excel"]:
+            model.attach_excel(job["video"], job["excel"])
+
+        step, scale, agitation = params.pop("step"), params.pop("scale"), params.pop("agitation")
+        source = model.source_info(job["video"], step, scale, agitation, **params)
+        data_frames, param_excels = model.analyze_all(step, scale, agitation, **params)
+
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        result_path = self.result_path(job["id"])
+        param_path = self.result_path(job["id"], "param")
+        if param_excels[0] is not None:
+            self._write_json(self._frame_to_json(param_excels[0]), param_path)
+        elif param_path.exists():
+            # Left by a previous attempt
+            param_path.unlink()
+        self._write_json(source, self.result_path(job["id"], "source"))
+        self._write_json(self._frame_to_json(data_frames[0]), result_path)
+        return str(result_path.resolve()), model.reference_errors.get(job["video"], [])
+
+    def run_worker(self, worker=None, lease_seconds=LEASE_SECONDS, poll_interval=POLL_INTERVAL, wait=False):
+        """
+        Process jobs until the queue is empty.
+
+        The lease of the current job is renewed in the background while it is analysed.
+        Failed jobs are put back in the queue until they reach the maximum number of attempts.
+
+        Args:
+            worker (str, optional): Worker identifier. Defaults to "<hostname>:<pid>".
+            lease_seconds (float, optional): Lease duration of a claimed job.
+            poll_interval (float, optional): Delay between two claims when no job is available.
+            wait (bool, optional): Keep waiting for new jobs instead of stopping when the queue is empty.
+
+        Returns:
+            int: Number of jobs processed successfully.
+        """
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        processed = 0
+
+        while True:
+            job = self.queue.claim(worker, lease_seconds)
+            if job is None:
+                counts = self.queue.counts()
+                if not wait and not counts.get("pending") and not counts.get("running"):
+                    return processed
+                time.sleep(poll_interval)
+                continue
+
+            done = threading.Event()
+            keeper = threading.Thread(target=self._keep_lease, args=(job["id"], worker, lease_seconds, done),
+                                      daemon=True)
+            keeper.start()
+            try:
+                result_path, warnings = self.run_job(job)
+                self.queue.complete(job["id"], worker, result_path, warnings)
+                processed += 1
+            except Exception as e:
+                self.queue.fail(job["id"], worker, str(e))
+            finally:
+                done.set()
+                keeper.join()
+
+    def result_path(self, job_id, suffix=None):
+        """
+        Return the path of a result file of a job in the shared results directory.
+
+        Args:
+            job_id (int): Identifier of the job.
+            suffix (str, optional): "param" for the reference parameters of the video,
+                "source" for its recorded source.
+
+        Returns:
+            Path: Path of the result file.
+        """
+        name = f"job_{job_id}_{suffix}.json" if suffix else f"job_{job_id}.json"
+        return self.results_dir / name
+
+    def unfinished_jobs(self):
+        """
+        Return the jobs that are not done yet (pending, running or failed).
+
+        Returns:
+            list: Jobs as returned by `JobQueue.jobs`.
+        """
+        return [job for job in self.queue.jobs() if job["status"] != "done"]
+
+    def assemble(self, output_filename, partial=False, **export_options):
+        """
+        Build the Excel workbook from the finished jobs, in the order they were enqueued.
+
+        Result files are looked up in the results directory of this model, so the
+        coordinator does not depend on the working directory of the workers. The source
+        of each video is recorded in the "Sources" sheet, so that the workbook can later
+        be updated instead of fully re-exported.
+
+        Args:
+            output_filename (str): Name of the resulting Excel file (must end with .xlsx).
+            partial (bool, optional): Assemble the finished jobs even if other jobs are not done.
+            **export_options: Additional keyword arguments forwarded to `ExportModel.export_results`.
+
+        Returns:
+            str: Path to the saved Excel file.
+
+        Raises:
+            ValueError: If some jobs are not done (unless `partial`), or if no job is finished.
+        """
+        unfinished = self.unfinished_jobs()
+        if unfinished and not partial:
+            details = ", ".join(f"{job['id']} ({job['status']}: {job['video']})" for job in unfinished)
+            raise ValueError(f"{len(unfinished)} job(s) not done: {details}")
+
+        data_frames = []
+        param_excels = []
+        sources = []
+        for job in self.queue.jobs():
+            if job["status"] != "done":
+                continue
+            result_path = self.result_path(job["id"])
+            param_path = self.result_path(job["id"], "param")
+            source_path = self.result_path(job["id"], "source")
+            data_frames.append(self._frame_from_json(self._read_json(result_path)))
+            param_excels.append(self._frame_from_json(self._read_json(param_path)) if param_path.exists() else None)
+            sources.append(self._read_json(source_path) if source_path.exists() else None)
+
+        if not data_frames:
+            raise ValueError("No finished job to assemble.")
+        return ExportModel().export_results(output_filename, data_frames, param_excels, sources=sources,
+                                            **export_options)
+
+    def _keep_lease(self, job_id, worker, lease_seconds, done):
+        """Renew the lease of a job until its analysis is over."""
+        while not done.wait(lease_seconds / 3):
+            if not self.queue.renew(job_id, worker, lease_seconds):
+                break
+
+    def _write_json(self, data, path):
+        """Write a JSON file atomically."""
+        tmp_path = path.with_name(f"{path.name}.{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, default=_json_value), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path):
+        """Read a JSON file."""
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _frame_to_json(self, df):
+        """
+        Convert a DataFrame to a JSON-serialisable dictionary.
+
+        JSON rather than pickle: result files are shared between machines whose pandas
+        versions may differ, and loading them must not be able to run code.
+        """
+        split = df.to_dict("split")
+        return {"columns": split["columns"], "data": split["data"]}
+
+    def _frame_from_json(self, data):
+        """Rebuild a DataFrame written by `_frame_to_json`."""
+        return pd.DataFrame(data["data"], columns=data["columns"])
+
+
+def _json_value(value):
+    """Convert the values `json` cannot serialise (NumPy scalars, dates)."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
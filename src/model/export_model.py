@@ -8,9 +8,14 @@ Contact: maximeg391@gmail.com
 License: MIT License
 """
 
+import re
 import pandas as pd
+from openpyxl import load_workbook
 from pathlib import Path
-from processing.export_utils import generate_summary_sheet, add_summary_chart
+from processing.export_utils import generate_summary_sheet, add_summary_chart, sheet_to_dataframe, CHART_MAX_POINTS
+
+SOURCES_SHEET = "Sources"
+VIDEO_SHEET_PATTERN = re.compile(r"^video(\d+)$")
 
 
 class ExportModel:
@@ -18,10 +23,17 @@ class ExportModel:
     Handles the export of analysis data to Excel files.
 
     This includes writing a summary sheet, per-video analysis sheets,
-    optional parameter sheets, and generating a chart.
+    optional parameter sheets, and generating a chart. A hidden "Sources" sheet
+    records which video and parameters produced each per-video sheet, so that an
+    existing workbook can later be updated instead of fully re-exported.
     """
 
-    def export_results(self, output_filename, data_frames, param_excels):
+    def output_path(self, output_filename):
+        """Return the path of a results workbook."""
+        return Path("results") / output_filename
+
+    def export_results(self, output_filename, data_frames, param_excels, chart_overlay=False,
+                       chart_max_points=CHART_MAX_POINTS, sources=None):
         """
         Export all video analysis data and optional configuration parameters to an Excel file.
 
@@ -29,19 +41,24 @@ class ExportModel:
         - A summary sheet aggregating key results from all videos.
         - One sheet per video with detailed frame-by-frame analysis.
         - Optionally, one sheet per video with attached Excel parameter values.
-        - A summary chart added to the Excel workbook.
+        - Summary charts (bubble count, mean area, standard deviation) added to the Excel workbook,
+          optionally with per-video overlay charts.
 
         Args:
             output_filename (str): Name of the resulting Excel file (must end with .xlsx).
             data_frames (List[pd.DataFrame]): List of dataframes containing per-video analysis results.
             param_excels (List[pd.DataFrame or None]): List of dataframes with configuration parameters
                 or None for videos without attached Excel files.
+            chart_overlay (bool): Whether to add charts overlaying the curves of every video.
+            chart_max_points (int): Maximum number of points plotted per chart; larger tables are decimated.
+            sources (List[dict or None], optional): Video and parameters of each video, recorded in the
+                "Sources" sheet. Videos with a None source are not recorded.
 
         Returns:
             str: Path to the saved Excel file as a string.
         """
         Path("results").mkdir(parents=True, exist_ok=True)
-        output_path = Path("results") / output_filename
+        output_path = self.output_path(output_filename)
         summary_df = generate_summary_sheet(data_frames)
 
         with pd.ExcelWriter(output_path) as writer:
@@ -56,7 +73,153 @@ class ExportModel:
                 if param_excels[i] is not None:
                     param_excels[i].to_excel(writer, sheet_name=f"video{i+1}_param", index=False)
 
-            # Add a summary chart to the workbook
-            add_summary_chart(writer.book)
+            if sources is not None:
+                self._write_sources(writer, {f"video{i+1}": source for i, source in enumerate(sources)
+                                             if source is not None})
+
+            # Add the summary charts to the workbook
+            overlay_sheets = [f"video{i+1}" for i in range(len(data_frames))] if chart_overlay else None
+            add_summary_chart(writer.book, max_points=chart_max_points, overlay_sheets=overlay_sheets,
+                              summary_df=summary_df, overlay_frames=data_frames if chart_overlay else None)
 
         return str(output_path)
+
+    def read_sources(self, output_filename):
+        """
+        Read the video and parameters recorded for each per-video sheet of an existing workbook.
+
+        Args:
+            output_filename (str): Name of the results Excel file.
+
+        Returns:
+            dict: Mapping from sheet name ("videoN") to its source, empty if the workbook
+                does not exist or has no "Sources" sheet.
+        """
+        output_path = self.output_path(output_filename)
+        if not output_path.exists():
+            return {}
+        workbook = load_workbook(output_path, read_only=True)
+        try:
+            if SOURCES_SHEET not in workbook.sheetnames:
+                return {}
+            df = sheet_to_dataframe(workbook[SOURCES_SHEET])
+        finally:
+            workbook.close()
+        # Empty cells (no Excel file, no tolerance) are read back as NaN
+        records = [{key: None if pd.isna(value) else value for key, value in row.items()}
+                   for row in df.to_dict("records")]
+        return {row.pop("sheet"): row for row in records}
+
+    def video_sheets(self, output_filename):
+        """
+        List the per-video sheets ("videoN") of an existing workbook.
+
+        Args:
+            output_filename (str): Name of the results Excel file.
+
+        Returns:
+            list: Sheet names, empty if the workbook does not exist.
+        """
+        output_path = self.output_path(output_filename)
+        if not output_path.exists():
+            return []
+        workbook = load_workbook(output_path, read_only=True)
+        try:
+            return [name for name in workbook.sheetnames if VIDEO_SHEET_PATTERN.match(name)]
+        finally:
+            workbook.close()
+
+    def plan_update(self, output_filename, sources):
+        """
+        Decide which videos must be (re)analysed to update an existing workbook.
+
+        A video whose recorded source (file size, modification time, reference Excel file
+        and analysis parameters) is unchanged is skipped. A changed video keeps its sheet;
+        a new video gets the next free "videoN" sheet. Sheets without a recorded source
+        (workbooks exported before sources were recorded) are kept as they are.
+
+        Args:
+            output_filename (str): Name of the results Excel file.
+            sources (dict): Mapping from video path to its current source, as built by `VideoModel.source_info`.
+
+        Returns:
+            dict: Mapping from video path to the sheet name to write, for the videos to analyse only.
+        """
+        recorded = self.read_sources(output_filename)
+        sheet_of_video = {source["video"]: sheet for sheet, source in recorded.items()}
+        used = [int(m.group(1)) for m in map(VIDEO_SHEET_PATTERN.match, self.video_sheets(output_filename)) if m]
+        next_index = max(used, default=0) + 1
+
+        plan = {}
+        for video_path, source in sources.items():
+            sheet = sheet_of_video.get(source["video"])
+            if sheet is not None and recorded[sheet] == source:
+                continue
+            if sheet is None:
+                sheet = f"video{next_index}"
+                next_index += 1
+            plan[video_path] = sheet
+        return plan
+
+    def update_results(self, output_filename, updates, chart_overlay=False, chart_max_points=CHART_MAX_POINTS):
+        """
+        Add or replace per-video sheets of an existing workbook, then rebuild its summary.
+
+        Other per-video sheets are left untouched; the "Résumé" sheet and its charts are
+        recomputed from the data stored in every "videoN" sheet. When the workbook does not
+        exist yet, it is created.
+
+        Args:
+            output_filename (str): Name of the results Excel file.
+            updates (dict): Mapping from sheet name ("videoN") to a (data frame, parameters or None,
+                source or None) tuple.
+            chart_overlay (bool): Whether to add charts overlaying the curves of every video.
+            chart_max_points (int): Maximum number of points plotted per chart; larger tables are decimated.
+
+        Returns:
+            str: Path to the Excel file.
+        """
+        output_path = self.output_path(output_filename)
+        if not output_path.exists():
+            ordered = sorted(updates.items(), key=lambda item: int(VIDEO_SHEET_PATTERN.match(item[0]).group(1)))
+            return self.export_results(output_filename, [df for _, (df, _, _) in ordered],
+                                       [param for _, (_, param, _) in ordered], chart_overlay=chart_overlay,
+                                       chart_max_points=chart_max_points,
+                                       sources=[source for _, (_, _, source) in ordered])
+        if not updates:
+            return str(output_path)
+
+        sources = self.read_sources(output_filename)
+        with pd.ExcelWriter(output_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+            book = writer.book
+            for sheet_name, (df, df_param, source) in updates.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+                param_sheet = f"{sheet_name}_param"
+                if df_param is not None:
+                    df_param.to_excel(writer, sheet_name=param_sheet, index=False)
+                elif param_sheet in book.sheetnames:
+                    del book[param_sheet]
+
+                if source is not None:
+                    sources[sheet_name] = source
+
+            video_sheets = sorted((name for name in book.sheetnames if VIDEO_SHEET_PATTERN.match(name)),
+                                  key=lambda name: int(VIDEO_SHEET_PATTERN.match(name).group(1)))
+            video_frames = [sheet_to_dataframe(book[name]) for name in video_sheets]
+            summary_df = generate_summary_sheet(video_frames)
+            summary_df.to_excel(writer, sheet_name="Résumé", index=False)
+
+            self._write_sources(writer, sources)
+            add_summary_chart(book, max_points=chart_max_points, overlay_sheets=video_sheets if chart_overlay else None,
+                              summary_df=summary_df, overlay_frames=video_frames if chart_overlay else None)
+
+        return str(output_path)
+
+    def _write_sources(self, writer, sources):
+        """Write the hidden "Sources" sheet from a mapping of sheet name to source."""
+        if SOURCES_SHEET in writer.book.sheetnames:
+            del writer.book[SOURCES_SHEET]
+        df = pd.DataFrame([{"sheet": sheet, **source} for sheet, source in sources.items()])
+        df.to_excel(writer, sheet_name=SOURCES_SHEET, index=False)
+        writer.book[SOURCES_SHEET].sheet_state = "hidden"
@@ -8,10 +8,21 @@ Contact: maximeg391@gmail.com
 License: MIT License
 """
 
+import os
+import json
+import threading
 import cv2
 import pandas as pd
-from processing.video_analyser import analyse_video
-from processing.export_utils import extract_relevant_excel_data
+from concurrent.futures import ThreadPoolExecutor
+from processing.video_analyser import analyse_video, analyse_video_sweep, count_reused
+from processing.image_analyser import threshold_label, DEFAULT_THRESHOLD
+from processing.export_utils import read_selected_sheets, select_excel_frames
+from processing.live_analyser import LiveAnalyser
+from processing.frame_index import FrameIndex, read_frame
+from processing.settings_manager import load_settings
+
+# Number of reference Excel files read ahead of the video being analysed
+REFERENCE_PREFETCH = 1
 
 
 class VideoModel:
@@ -22,9 +33,18 @@ class VideoModel:
     and triggers the analysis pipeline across all loaded videos.
     """
 
-    def __init__(self):
-        """Initialize an empty video model."""
+    def __init__(self, columns=None):
+        """
+        Initialize an empty video model.
+
+        Args:
+            columns (dict, optional): Columns to read from each sheet of the reference Excel
+                files. Defaults to the "columns" selection of the settings.
+        """
+        self.columns = columns
         self.videos_data = {}
+        self.reuse_report = {}
+        self.reference_errors = {}
 
     def add_video(self, file_path):
         """
@@ -42,10 +62,50 @@ class VideoModel:
             cap = cv2.VideoCapture(file_path)
             frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             cap.release()
-            self.videos_data[file_path] = {"excel": None, "frame": frames}
+            self.videos_data[file_path] = {"excel": None, "frame": frames, "live": None}
             return frames
         return None
 
+    def start_live(self, file_path, step, scale, agitation):
+        """
+        Start following a recording while it is being acquired.
+
+        The recording is added to the model if needed, so that the final analysis
+        can reuse the results computed live. New frames are read and analysed in a
+        background thread.
+
+        Args:
+            file_path (str): Path to the growing video file or to the directory filling with images.
+            step (int): Interval between analyzed frames (1 = every frame).
+            scale (float): Pixel to centimeter conversion factor.
+            agitation (int): Number of frames to skip at the beginning.
+
+        Returns:
+            LiveAnalyser: The incremental analyser attached to the recording.
+        """
+        self.add_video(file_path)
+        analyser = LiveAnalyser(file_path, step=step, scale=scale, agitation=agitation)
+        self.videos_data[file_path]["live"] = analyser
+        analyser.start()
+        return analyser
+
+    def stop_live(self, file_path):
+        """
+        Stop following a recording, keeping the results already computed.
+
+        Args:
+            file_path (str): Path to the followed recording.
+
+        Returns:
+            int or None: Number of frames read so far, None if the recording is not followed.
+        """
+        info = self.videos_data.get(file_path)
+        if not info or info.get("live") is None:
+            return None
+        info["live"].stop()
+        info["frame"] = max(info["frame"], info["live"].frames_read)
+        return info["frame"]
+
     def remove_video(self, file_path):
         """
         Remove a video from the model.
@@ -54,8 +114,60 @@ class VideoModel:
             file_path (str): Path to the video file to remove.
         """
         if file_path in self.videos_data:
+            index = self.videos_data[file_path].get("index")
+            if index is not None:
+                index.close()
+            live = self.videos_data[file_path].get("live")
+            if live is not None:
+                live.stop()
             del self.videos_data[file_path]
 
+    def get_frame(self, file_path, frame_number):
+        """
+        Return a single frame of a loaded video.
+
+        The frame index of the video is loaded from the disk cache. Without a cached index,
+        the frame is read directly and the index is built in a background thread, so that
+        later requests are fast without blocking this one.
+
+        Args:
+            file_path (str): Path to the video file.
+            frame_number (int): Index of the frame to read.
+
+        Returns:
+            np.ndarray: The decoded BGR frame.
+
+        Raises:
+            IndexError: If the frame number is outside the video.
+        """
+        info = self.videos_data[file_path]
+        if info.get("index") is None:
+            info["index"] = FrameIndex.load_cached(file_path)
+        if info["index"] is None:
+            self._build_index_in_background(file_path)
+            return read_frame(file_path, frame_number)
+        return info["index"].get_frame(frame_number)
+
+    def _build_index_in_background(self, file_path):
+        """Build the frame index of a video in a daemon thread, once."""
+        info = self.videos_data[file_path]
+        if info.get("index_builder") is not None:
+            return
+
+        def build():
+            try:
+                index = FrameIndex.load_or_build(file_path)
+            except Exception:
+                info["index_builder"] = None
+                return
+            if self.videos_data.get(file_path) is info:
+                info["index"] = index
+            else:
+                index.close()
+
+        info["index_builder"] = threading.Thread(target=build, daemon=True)
+        info["index_builder"].start()
+
     def attach_excel(self, file_path, excel_path):
         """
         Attach an Excel file to a video for later data enrichment.
@@ -67,19 +179,62 @@ class VideoModel:
         if file_path in self.videos_data:
             self.videos_data[file_path]["excel"] = excel_path
 
-    def analyze_all(self, step, scale, agitation):
+    def source_info(self, file_path, step, scale, agitation, **options):
+        """
+        Describe the inputs that determine the analysis results of a video.
+
+        Args:
+            file_path (str): Path to the video file.
+            step (int): Interval between analyzed frames (1 = every frame).
+            scale (float): Pixel to centimeter conversion factor.
+            agitation (int): Number of frames to skip at the beginning.
+            **options: Analysis options, as passed to `analyze_all`. Only those changing
+                the results (`threshold`, `change_tolerance`, luma-only decoding) are recorded.
+
+        Returns:
+            dict: Absolute video path, file size and modification time, attached Excel file,
+                parameters and the Excel column selection.
+        """
+        stat = os.stat(file_path)
+        return {
+            "video": os.path.abspath(file_path),
+            "size": stat.st_size,
+            # Rounded to the millisecond so that it survives the round trip through Excel
+            "mtime": round(stat.st_mtime, 3),
+            "excel": self.videos_data[file_path]["excel"],
+            "step": step,
+            "scale": scale,
+            "agitation": agitation,
+            "threshold": threshold_label(options.get("threshold", DEFAULT_THRESHOLD)),
+            "change_tolerance": options.get("change_tolerance"),
+            "grayscale": bool((options.get("decode") or {}).get("grayscale", False)),
+            "columns": json.dumps(self.selected_columns(), ensure_ascii=False),
+        }
+
+    def analyze_all(self, step, scale, agitation, video_paths=None, progress=None, **options):
         """
         Analyze all loaded videos and optionally merge Excel data.
 
         For each video:
-        - Analyze the video using `analyse_video`.
-        - If an Excel file is attached, enrich results using `extract_relevant_excel_data`.
+        - Analyze the video using `analyse_video`, or finish and reuse the live
+          analysis when it was run with the same parameters.
+        - If an Excel file is attached, enrich results with the rows of the analysed frames.
         - Extract configuration parameters from the last sheet of the Excel file if available.
 
+        The attached Excel files are read in the background while the videos are
+        analysed; only the row selection waits for the analysis. The number of analysed
+        and reused (near-duplicate) frames of each video is stored in `reuse_report`,
+        and the errors met while reading its Excel file in `reference_errors`.
+
         Args:
             step (int): Interval between analyzed frames (1 = every frame).
             scale (float): Pixel to centimeter conversion factor.
             agitation (int): Number of frames to skip at the beginning.
+            video_paths (List[str], optional): Videos to analyze, in this order. Defaults to all loaded videos.
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+            **options: Additional keyword arguments forwarded to `analyse_video`
+                (e.g. `workers` and `queue_size` for the pipelined mode, `change_tolerance`
+                to skip near-duplicate frames).
 
         Returns:
             tuple:
@@ -89,29 +244,181 @@ class VideoModel:
         data_frames = []
         param_excels = []
 
-        for video_path, info in self.videos_data.items():
-            results = analyse_video(video_path, step=step, scale=scale, agitation=agitation)
-            frames = [r["frame"] for r in results]
-            df = pd.DataFrame(results)
-
-            excel_path = info.get("excel")
-            if excel_path:
-                try:
-                    # Merge with relevant Excel data
-                    excel_data = extract_relevant_excel_data(excel_path, frames)
-                    df = pd.merge(df, excel_data, on="frame")
-
-                    # Extract configuration parameters from the last sheet
-                    xls = pd.ExcelFile(excel_path)
-                    last_sheet = xls.sheet_names[-1]
-                    df_param = xls.parse(last_sheet)
-                    df_param.columns = ['Configuration', 'Value']
-                    param_excels.append(df_param)
-                except Exception as e:
-                    print(e)
-                    param_excels.append(None)
-            else:
-                param_excels.append(None)
+        self.reuse_report = {}
+        self.reference_errors = {}
+        if video_paths is None:
+            video_paths = list(self.videos_data.keys())
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        references = {}
+        try:
+            for index, video_path in enumerate(video_paths):
+                self._prefetch_references(video_paths, index, references, executor)
+                if progress:
+                    progress(index, len(video_paths), video_path)
+                info = self.videos_data[video_path]
+                live = info.get("live")
+                if (live is not None and live.matches(step, scale, agitation)
+                        and options.get("threshold", DEFAULT_THRESHOLD) == DEFAULT_THRESHOLD):
+                    results = live.finish()
+                    info["frame"] = max(info["frame"], live.frames_read)
+                elif os.path.isdir(video_path):
+                    raise ValueError(self._live_mismatch_message(video_path))
+                else:
+                    results = analyse_video(video_path, step=step, scale=scale, agitation=agitation, **options)
+                frames = [r["frame"] for r in results]
+                self.reuse_report[video_path] = {"frames": len(results), "reused": count_reused(results)}
 
-            data_frames.append(df)
+                excel_data, df_param = self._load_reference(video_path, references.pop(video_path, None), frames)
+                data_frames.append(self._merge_reference(results, excel_data))
+                param_excels.append(df_param)
+        finally:
+            self._cancel_references(references, executor)
         return data_frames, param_excels
+
+    def analyze_sweep(self, step, scale, agitation, thresholds, progress=None, **options):
+        """
+        Analyze all loaded videos for several binarisation thresholds.
+
+        Each video is decoded once with `analyse_video_sweep`; its Excel file, if any,
+        is read once in the background and merged into the results of every threshold.
+
+        Args:
+            step (int): Interval between analyzed frames (1 = every frame).
+            scale (float): Pixel to centimeter conversion factor.
+            agitation (int): Number of frames to skip at the beginning.
+            thresholds (list): Fixed threshold values, "otsu" or "adaptive".
+            progress (callable, optional): Called with (index, total, video_path) before each video.
+            **options: Additional keyword arguments forwarded to `analyse_video_sweep`.
+
+        Returns:
+            dict: For each threshold label, a (data_frames, param_excels) tuple as returned by `analyze_all`.
+        """
+        sweeps = {threshold_label(threshold): ([], []) for threshold in thresholds}
+        self.reuse_report = {}
+        self.reference_errors = {}
+        video_paths = list(self.videos_data.keys())
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        references = {}
+        try:
+            for index, video_path in enumerate(video_paths):
+                self._prefetch_references(video_paths, index, references, executor)
+                if progress:
+                    progress(index, len(video_paths), video_path)
+                if os.path.isdir(video_path):
+                    raise ValueError(self._live_mismatch_message(video_path))
+                by_threshold = analyse_video_sweep(video_path, thresholds, step=step, scale=scale,
+                                                   agitation=agitation, **options)
+                frames = [r["frame"] for r in next(iter(by_threshold.values()), [])]
+
+                excel_data, df_param = self._load_reference(video_path, references.pop(video_path, None), frames)
+                for label, results in by_threshold.items():
+                    sweeps[label][0].append(self._merge_reference(results, excel_data))
+                    sweeps[label][1].append(df_param)
+        finally:
+            self._cancel_references(references, executor)
+        return sweeps
+
+    def selected_columns(self):
+        """Return the columns read from each sheet of the reference Excel files."""
+        if self.columns is not None:
+            return self.columns
+        return load_settings().get("columns", {})
+
+    def _live_mismatch_message(self, directory):
+        """Explain why an image directory followed live cannot be analysed with other parameters."""
+        live = self.videos_data[directory].get("live")
+        followed = ""
+        if live is not None:
+            followed = f" (step={live.step}, scale={live.scale}, agitation={live.agitation}, default threshold)"
+        return (f"{os.path.basename(directory)} is an image folder: it can only be exported with the "
+                f"parameters it was followed live with{followed}.")
+
+    def _prefetch_references(self, video_paths, index, references, executor):
+        """
+        Start reading the Excel files of the video about to be analysed and of the next ones.
+
+        Only `REFERENCE_PREFETCH` files are read ahead, so that at most a few parsed
+        workbooks are kept in memory. A single background thread is used so that reading
+        competes as little as possible with the analysis, and the next needed file is
+        always read first.
+
+        Args:
+            video_paths (List[str]): Videos to analyse, in this order.
+            index (int): Position of the video about to be analysed.
+            references (dict): Future of `_read_reference` for each pending video, updated in place.
+            executor (ThreadPoolExecutor): Executor running the reads.
+        """
+        for path in video_paths[index:index + REFERENCE_PREFETCH + 1]:
+            excel_path = self.videos_data[path].get("excel")
+            if excel_path and path not in references:
+                references[path] = executor.submit(self._read_reference, excel_path)
+
+    def _cancel_references(self, references, executor):
+        """Cancel the reads that have not started yet and release the reading thread."""
+        for future in references.values():
+            future.cancel()
+        references.clear()
+        executor.shutdown(wait=False)
+
+    def _read_reference(self, excel_path):
+        """
+        Read the reference sheets and the configuration parameters of an Excel file.
+
+        Args:
+            excel_path (str): Path to the attached Excel file.
+
+        A configuration sheet that cannot be read only drops the parameters: the frame
+        data is still merged, and the error is reported with the sheet errors.
+
+        Returns:
+            tuple: (dict of sheet DataFrames, configuration parameters DataFrame or None, list of sheet errors).
+        """
+        errors = []
+        with pd.ExcelFile(excel_path) as xls:
+            sheets = read_selected_sheets(xls, errors, self.selected_columns())
+
+            # Extract configuration parameters from the last sheet
+            last_sheet = xls.sheet_names[-1]
+            try:
+                df_param = xls.parse(last_sheet)
+                df_param.columns = ['Configuration', 'Value']
+            except Exception as e:
+                errors.append(f"Erreur lors de la lecture des paramètres (feuille {last_sheet}): {e}")
+                df_param = None
+        return sheets, df_param, errors
+
+    def _load_reference(self, video_path, reference, frames):
+        """
+        Wait for the reference Excel data of a video and select the rows of the analysed frames.
+
+        Errors are stored in `reference_errors` for the video instead of interrupting the analysis.
+
+        Args:
+            video_path (str): Path to the analysed video.
+            reference (Future or None): Pending result of `_read_reference`, None if no Excel file is attached.
+            frames (List[int]): Indices of the analysed frames.
+
+        Returns:
+            tuple: (pd.DataFrame or None, pd.DataFrame or None) with the frame data and the parameters.
+        """
+        if reference is None:
+            return None, None
+        errors = []
+        try:
+            sheets, df_param, errors = reference.result()
+            excel_data = select_excel_frames(sheets, frames, errors)
+        except Exception as e:
+            errors.append(str(e))
+            excel_data, df_param = None, None
+        if errors:
+            self.reference_errors[video_path] = errors
+        return excel_data, df_param
+
+    def _merge_reference(self, results, excel_data):
+        """Build the results DataFrame of a video, merged with its reference Excel data if any."""
+        df = pd.DataFrame(results)
+        if excel_data is not None:
+            df = pd.merge(df, excel_data, on="frame")
+        return df
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: benchmark.py
+Author: Maxime Gosselin
+Description: This script measures the per-frame time and memory allocations of the analysis loop
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import sys
+import time
+import tracemalloc
+import cv2
+from typing import Dict
+from processing.image_analyser import analyse_image, AnalysisBuffers
+
+
+def _run(video_path: str, max_frames: int, reuse_buffers: bool) -> Dict[str, float]:
+    """
+    Analyse les `max_frames` premières images et mesure, pour chaque image, le pic
+    de mémoire allouée pendant cette image. Les libérations de mémoire allouée avant
+    l'image (l'image précédente par exemple) ne sont pas déduites.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Impossible d'ouvrir la vidéo : {video_path}")
+
+    buffers = AnalysisBuffers() if reuse_buffers else None
+    frame = None
+    peaks = []
+    start = time.perf_counter()
+
+    for _ in range(max_frames):
+        # Le suivi est relancé à chaque image pour remettre le pic à zéro :
+        # `tracemalloc.reset_peak` n'existe qu'à partir de Python 3.9
+        tracemalloc.start()
+        try:
+            if reuse_buffers:
+                ret, frame = cap.read(frame)
+            else:
+                ret, frame = cap.read()
+            if not ret:
+                break
+            analyse_image(frame, buffers=buffers)
+
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak)
+
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    # La première image alloue les tampons : elle est exclue de la moyenne
+    steady = peaks[1:] or peaks
+    return {
+        "frames": len(peaks),
+        "ms_per_frame": 1000 * elapsed / max(len(peaks), 1),
+        "bytes_per_frame": sum(steady) / max(len(steady), 1),
+    }
+
+
+def benchmark_allocations(video_path: str, max_frames: int = 200) -> Dict[str, Dict[str, float]]:
+    """
+    Compare la boucle d'analyse avec et sans réutilisation des tampons de travail.
+
+    Args:
+        video_path (str): Chemin de la vidéo.
+        max_frames (int): Nombre d'images mesurées.
+
+    Returns:
+        dict: Mesures ("frames", "ms_per_frame", "bytes_per_frame") pour chaque mode.
+    """
+    return {
+        "allocations par image": _run(video_path, max_frames, reuse_buffers=False),
+        "tampons réutilisés": _run(video_path, max_frames, reuse_buffers=True),
+    }
+
+
+if __name__ == "__main__":
+    video = sys.argv[1] if len(sys.argv) > 1 else "assets/test/video.avi"
+    for mode, stats in benchmark_allocations(video).items():
+        print(f"{mode:>22} : {stats['frames']} images, {stats['ms_per_frame']:.2f} ms/image, "
+              f"{stats['bytes_per_frame'] / 1024:.1f} Ko alloués/image")
@@ -8,9 +8,13 @@ Contact: maximeg391@gmail.com
 License: MIT License
 """
 
+from __future__ import annotations
+
+import numpy as np
 import pandas as pd
+from typing import Dict, List, Optional
 from openpyxl.chart.axis import ChartLines
-from openpyxl.chart import LineChart, Reference
+from openpyxl.chart import ScatterChart, Reference, Series
 from openpyxl.chart.layout import Layout, ManualLayout
 from processing.settings_manager import load_settings
 
@@ -36,7 +40,7 @@ def generate_summary_sheet(data_frames: list[pd.DataFrame]) -> pd.DataFrame:
         summary_dict[col] = []
 
     # Colonnes supplémentaires (paramètres Excel)
-    extra_cols = [col for col in all_data.columns if col not in default_cols + ["frame"]]
+    extra_cols = [col for col in all_data.columns if col not in default_cols + ["frame", "image_reutilisee"]]
     for col in extra_cols:
         summary_dict[col] = []
 
@@ -48,36 +52,119 @@ def generate_summary_sheet(data_frames: list[pd.DataFrame]) -> pd.DataFrame:
     return pd.DataFrame(summary_dict)
 
 
-def add_summary_chart(workbook, worksheet_name: str = "Résumé"):
+CHART_DATA_SHEET = "Données graphiques"
+CHART_MAX_POINTS = 2000
+CHART_MIN_POINTS_PER_VIDEO = 200
+CHART_ROW_SPAN = 18
+CHART_COLORS = ["4472C4", "ED7D31", "A5A5A5", "FFC000", "5B9BD5", "70AD47"]
+SUMMARY_CHARTS = [
+    ("nb_bulles", "Evolution du nombre de bulles", "Nombre de bulles"),
+    ("surface_moyenne[mm²]", "Evolution de la surface moyenne", "Surface moyenne [mm²]"),
+    ("ecart_type[mm²]", "Evolution de l'écart type", "Ecart type [mm²]"),
+]
+
+
+def sheet_to_dataframe(sheet) -> pd.DataFrame:
     """
-    Adds a line chart to the given worksheet showing bubble count evolution over frames.
+    Reads an openpyxl worksheet whose first row is a header into a DataFrame.
 
     Args:
-        workbook (openpyxl.Workbook): The workbook where the chart will be added.
-        worksheet_name (str, optional): Name of the worksheet containing the data. Defaults to "Résumé".
+        sheet (openpyxl.worksheet.worksheet.Worksheet): The worksheet to read.
+
+    Returns:
+        pd.DataFrame: The worksheet content, empty if the sheet is empty.
     """
-    sheet = workbook[worksheet_name]
-    max_row = sheet.max_row
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    return pd.DataFrame(list(rows), columns=list(header))
+
+
+def decimate_min_max(df: pd.DataFrame, columns: list[str], max_points: int) -> pd.DataFrame:
+    """
+    Reduces a DataFrame to about `max_points` rows while preserving the local extrema.
+
+    Rows are split into consecutive buckets; for each bucket, the rows holding the
+    minimum and the maximum of every column are kept, along with the first and last rows.
+
+    Args:
+        df (pd.DataFrame): Data to decimate, ordered along the x axis.
+        columns (list[str]): Columns whose extrema must be preserved.
+        max_points (int): Maximum number of rows to keep.
+
+    Returns:
+        pd.DataFrame: The decimated rows, in their original order.
+    """
+    if len(df) <= max_points or not columns:
+        return df.reset_index(drop=True)
+
+    values = df.reset_index(drop=True)
+    n_buckets = max(1, max_points // (2 * len(columns)))
+    buckets = np.arange(len(values)) * n_buckets // len(values)
+
+    keep = {0, len(values) - 1}
+    for col in columns:
+        grouped = pd.to_numeric(values[col], errors="coerce").fillna(0).groupby(buckets)
+        keep.update(grouped.idxmin().tolist())
+        keep.update(grouped.idxmax().tolist())
+
+    return values.iloc[sorted(keep)].reset_index(drop=True)
+
+
+def _write_chart_data(workbook, df: pd.DataFrame) -> tuple:
+    """
+    Appends the columns of `df` to the chart data sheet, after the columns already written.
+
+    Returns:
+        tuple: The chart data sheet and a mapping from column name to column index.
+    """
+    if CHART_DATA_SHEET in workbook.sheetnames:
+        data_sheet = workbook[CHART_DATA_SHEET]
+        first_col = data_sheet.max_column + 1
+    else:
+        data_sheet = workbook.create_sheet(CHART_DATA_SHEET)
+        first_col = 1
 
-    chart = LineChart()
-    chart.title = "Evolution du nombre de bulles"
+    col_of = {}
+    for offset, name in enumerate(df.columns):
+        col = first_col + offset
+        col_of[name] = col
+        data_sheet.cell(row=1, column=col, value=name)
+        for row, value in enumerate(df[name].tolist(), start=2):
+            data_sheet.cell(row=row, column=col, value=value)
+
+    return data_sheet, col_of
+
+
+def _chart_source(workbook, sheet, x_col: str, y_cols: list[str], max_points: int,
+                  df: pd.DataFrame = None) -> tuple:
+    """
+    Returns the sheet, column mapping, row count and decimation flag to plot `y_cols` against `x_col`.
+
+    Small tables are plotted directly from `sheet`; larger ones are decimated into
+    the chart data sheet so that chart size does not depend on the number of frames.
+    `df` is the content of `sheet` when it is already in memory; otherwise the sheet is read back.
+    """
+    if df is None:
+        df = sheet_to_dataframe(sheet)
+    if len(df) <= max_points:
+        return sheet, {name: i + 1 for i, name in enumerate(df.columns)}, len(df), False
+
+    chart_df = decimate_min_max(df[[x_col] + y_cols], y_cols, max_points)
+    chart_df.columns = [x_col] + y_cols
+    data_sheet, col_of = _write_chart_data(workbook, chart_df)
+    return data_sheet, col_of, len(chart_df), True
+
+
+def _style_chart(chart, title: str, y_title: str):
+    """Applies the common title, axes and layout of the summary charts."""
+    chart.title = title
     chart.style = 2
-    chart.y_axis.title = "Nombre de bulles"
+    chart.y_axis.title = y_title
     chart.x_axis.title = "Image"
     chart.y_axis.majorGridlines = ChartLines()
     chart.x_axis.majorGridlines = None
-
-    data = Reference(sheet, min_col=2, min_row=1, max_row=max_row)
-    cats = Reference(sheet, min_col=1, min_row=2, max_row=max_row)
-    chart.add_data(data, titles_from_data=True)
-    chart.set_categories(cats)
-    chart.legend = None
-
-    serie = chart.series[0]
-    serie.smooth = True
-    serie.graphicalProperties.line.solidFill = "4472C4"
-    serie.marker.symbol = "none"
-
     chart.layout = Layout(
         manualLayout=ManualLayout(
             x=0.01,
@@ -87,33 +174,160 @@ def add_summary_chart(workbook, worksheet_name: str = "Résumé"):
         )
     )
 
-    sheet.add_chart(chart, "G2")
 
+def add_summary_chart(workbook, worksheet_name: str = "Résumé", max_points: int = CHART_MAX_POINTS,
+                      overlay_sheets: list[str] = None, summary_df: pd.DataFrame = None,
+                      overlay_frames: list[pd.DataFrame] = None):
+    """
+    Adds scatter charts to the given worksheet showing bubble count, mean area and
+    standard deviation evolution over frames.
 
-def extract_relevant_excel_data(excel_path: str, important_frames: list[int]) -> pd.DataFrame:
+    Scatter charts keep the x axis proportional to the frame number, which category
+    axes do not once the data is decimated. When the summary holds more than
+    `max_points` rows, the charts are built from a min/max-preserving decimation
+    written to the "Données graphiques" sheet.
+
+    Args:
+        workbook (openpyxl.Workbook): The workbook where the chart will be added.
+        worksheet_name (str, optional): Name of the worksheet containing the data. Defaults to "Résumé".
+        max_points (int, optional): Maximum number of points plotted per chart.
+        overlay_sheets (list[str], optional): Per-video sheets to overlay in additional charts.
+        summary_df (pd.DataFrame, optional): Content of the summary worksheet, read back from it if omitted.
+        overlay_frames (list[pd.DataFrame], optional): Content of each overlay sheet, read back if omitted.
     """
-    Extracts and merges data from specific sheets of an Excel file for selected frame indices.
+    sheet = workbook[worksheet_name]
+    if CHART_DATA_SHEET in workbook.sheetnames:
+        del workbook[CHART_DATA_SHEET]
+
+    header = list(summary_df.columns) if summary_df is not None else [cell.value for cell in sheet[1]]
+    y_cols = [col for col, _, _ in SUMMARY_CHARTS if col in header]
+    source, col_of, n_rows, decimated = _chart_source(workbook, sheet, "frame", y_cols, max_points, summary_df)
+
+    position = 0
+    for col, title, y_title in SUMMARY_CHARTS:
+        if col not in col_of:
+            continue
+
+        chart = ScatterChart()
+        _style_chart(chart, title, y_title)
+        chart.scatterStyle = "line"
+        chart.legend = None
+
+        x_values = Reference(source, min_col=col_of["frame"], min_row=2, max_row=n_rows + 1)
+        y_values = Reference(source, min_col=col_of[col], min_row=2, max_row=n_rows + 1)
+        serie = Series(y_values, x_values, title=col)
+        serie.smooth = not decimated
+        serie.graphicalProperties.line.solidFill = CHART_COLORS[position % len(CHART_COLORS)]
+        serie.marker.symbol = "none"
+        chart.series.append(serie)
+
+        sheet.add_chart(chart, f"G{2 + position * CHART_ROW_SPAN}")
+        position += 1
+
+    if overlay_sheets:
+        add_overlay_charts(workbook, overlay_sheets, sheet, max_points, first_position=position,
+                           data_frames=overlay_frames)
+
+
+def add_overlay_charts(workbook, video_sheets: list[str], target_sheet, max_points: int = CHART_MAX_POINTS,
+                       first_position: int = 0, data_frames: list[pd.DataFrame] = None):
+    """
+    Adds one scatter chart per summary metric, overlaying the curve of every video.
+
+    The point budget is shared between videos, with a floor of
+    `CHART_MIN_POINTS_PER_VIDEO` points per video.
 
     Args:
-        excel_path (str): Path to the Excel file.
-        important_frames (list[int]): List of frame indices to extract.
+        workbook (openpyxl.Workbook): The workbook containing the per-video sheets.
+        video_sheets (list[str]): Names of the per-video sheets to overlay.
+        target_sheet (openpyxl.worksheet.worksheet.Worksheet): Worksheet receiving the charts.
+        max_points (int, optional): Total number of points plotted per chart.
+        first_position (int, optional): Chart slot of the first overlay chart.
+        data_frames (list[pd.DataFrame], optional): Content of each per-video sheet, read back if omitted.
+    """
+    per_video = max(CHART_MIN_POINTS_PER_VIDEO, max_points // max(1, len(video_sheets)))
+    if data_frames is None:
+        data_frames = [None] * len(video_sheets)
 
-    Returns:
-        pd.DataFrame: Merged DataFrame containing filtered data from both sheets.
+    sources = []
+    for name, df in zip(video_sheets, data_frames):
+        video_sheet = workbook[name]
+        header = list(df.columns) if df is not None else [cell.value for cell in video_sheet[1]]
+        y_cols = [col for col, _, _ in SUMMARY_CHARTS if col in header]
+        if "frame" not in header or not y_cols:
+            continue
+        sources.append((name, _chart_source(workbook, video_sheet, "frame", y_cols, per_video, df)))
+
+    for offset, (col, title, y_title) in enumerate(SUMMARY_CHARTS):
+        chart = ScatterChart()
+        _style_chart(chart, f"{title} par vidéo", y_title)
+        chart.scatterStyle = "line"
+
+        for index, (name, (source, col_of, n_rows, _)) in enumerate(sources):
+            if col not in col_of:
+                continue
+            x_values = Reference(source, min_col=col_of["frame"], min_row=2, max_row=n_rows + 1)
+            y_values = Reference(source, min_col=col_of[col], min_row=2, max_row=n_rows + 1)
+            serie = Series(y_values, x_values, title=name)
+            serie.graphicalProperties.line.solidFill = CHART_COLORS[index % len(CHART_COLORS)]
+            serie.marker.symbol = "none"
+            chart.series.append(serie)
+
+        if chart.series:
+            target_sheet.add_chart(chart, f"G{2 + (first_position + offset) * CHART_ROW_SPAN}")
+
+
+def read_selected_sheets(xls: pd.ExcelFile, errors: Optional[List[str]] = None,
+                         selected_columns: Optional[Dict[str, List[str]]] = None) -> Dict[str, pd.DataFrame]:
     """
-    settings = load_settings()
-    selected_columns = settings.get("columns", {})
+    Reads the selected columns from each sheet of an Excel file.
 
-    xls = pd.ExcelFile(excel_path)
-    final_frames_df = []
+    Reading does not depend on the analysed frames, so it can run while the video is
+    being analysed; `select_excel_frames` then picks the rows of the analysed frames.
+
+    Args:
+        xls (pd.ExcelFile): The opened Excel file.
+        errors (list[str], optional): Receives the errors of the skipped sheets. They are printed if omitted.
+        selected_columns (dict[str, list[str]], optional): Columns to read for each sheet name.
+            Defaults to the "columns" selection of the settings.
+
+    Returns:
+        dict[str, pd.DataFrame]: Selected columns of each sheet, in the order of the selection.
+    """
+    if selected_columns is None:
+        selected_columns = load_settings().get("columns", {})
+    sheets = {}
 
     for sheet_name, columns in selected_columns.items():
         if sheet_name not in xls.sheet_names:
             continue
 
         try:
-            df = xls.parse(sheet_name)
-            selected_df = df[columns].iloc[important_frames].reset_index(drop=True)
+            sheets[sheet_name] = xls.parse(sheet_name)[columns]
+        except Exception as e:
+            _report_error(errors, f"Erreur lors du traitement de la feuille {sheet_name}: {e}")
+
+    return sheets
+
+
+def select_excel_frames(sheets: Dict[str, pd.DataFrame], important_frames: List[int],
+                        errors: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Selects the rows of the given frame indices in sheets read by `read_selected_sheets` and merges them.
+
+    Args:
+        sheets (dict[str, pd.DataFrame]): Selected columns of each sheet.
+        important_frames (list[int]): List of frame indices to extract.
+        errors (list[str], optional): Receives the errors of the skipped sheets. They are printed if omitted.
+
+    Returns:
+        pd.DataFrame: Merged DataFrame containing filtered data from all sheets.
+    """
+    final_frames_df = []
+
+    for sheet_name, df in sheets.items():
+        try:
+            selected_df = df.iloc[important_frames].reset_index(drop=True)
 
             # Ajouter la colonne "frame" uniquement sur la première feuille traitée
             if not final_frames_df:
@@ -122,10 +336,36 @@ def extract_relevant_excel_data(excel_path: str, important_frames: list[int]) ->
             final_frames_df.append(selected_df)
 
         except Exception as e:
-            print(f"Erreur lors du traitement de la feuille {sheet_name}: {e}")
+            _report_error(errors, f"Erreur lors du traitement de la feuille {sheet_name}: {e}")
 
     if not final_frames_df:
         raise ValueError("Aucune donnée extraite depuis le fichier Excel.")
 
     final_df = pd.concat(final_frames_df, axis=1)
     return final_df
+
+
+def extract_relevant_excel_data(excel_path: str, important_frames: List[int],
+                                errors: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Extracts and merges data from specific sheets of an Excel file for selected frame indices.
+
+    Args:
+        excel_path (str): Path to the Excel file.
+        important_frames (list[int]): List of frame indices to extract.
+        errors (list[str], optional): Receives the errors of the skipped sheets. They are printed if omitted.
+
+    Returns:
+        pd.DataFrame: Merged DataFrame containing filtered data from both sheets.
+    """
+    with pd.ExcelFile(excel_path) as xls:
+        sheets = read_selected_sheets(xls, errors)
+    return select_excel_frames(sheets, important_frames, errors)
+
+
+def _report_error(errors: Optional[List[str]], message: str) -> None:
+    """Adds an error message to `errors`, or prints it when no list is given."""
+    if errors is None:
+        print(message)
+    else:
+        errors.append(message)
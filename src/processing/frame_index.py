@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: frame_index.py
+Author: Maxime Gosselin
+Description: This script builds a per-video frame index, cached on disk, for fast random access to frames
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import bisect
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+INDEX_CACHE_DIR = "cache"
+SEEK_INTERVAL = 50
+FRAME_CACHE_SIZE = 16
+
+
+def frame_signature(frame: np.ndarray) -> str:
+    """Empreinte courte d'une image décodée."""
+    return hashlib.blake2b(frame.tobytes(), digest_size=8).hexdigest()
+
+
+def _file_signature(video_path: str) -> dict:
+    """Chemin absolu, taille et date de modification identifiant une version du fichier."""
+    stat = os.stat(video_path)
+    return {"video": os.path.abspath(video_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _cache_path(video_path: str, cache_dir: str) -> Path:
+    """Chemin du fichier d'index associé à une vidéo."""
+    key = hashlib.blake2b(os.path.abspath(video_path).encode("utf-8"), digest_size=8).hexdigest()
+    return Path(cache_dir) / f"{Path(video_path).stem}_{key}.json"
+
+
+def read_frame(video_path: str, n: int) -> np.ndarray:
+    """
+    Lit l'image `n` d'une vidéo sans index, en décodant depuis le début.
+
+    Plus lent qu'un index pour les images éloignées, mais sans construction préalable.
+
+    Raises:
+        FileNotFoundError: Si la vidéo ne peut pas être ouverte.
+        IndexError: Si `n` est hors de la vidéo.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Impossible d'ouvrir la vidéo : {video_path}")
+    try:
+        for _ in range(max(n, 0)):
+            if not cap.grab():
+                raise IndexError(f"Image {n} hors de la vidéo")
+        ret, frame = cap.read()
+        if n < 0 or not ret:
+            raise IndexError(f"Image {n} hors de la vidéo")
+        return frame
+    finally:
+        cap.release()
+
+
+class FrameIndex:
+    """
+    Index d'une vidéo permettant un accès rapide à une image quelconque.
+
+    OpenCV ne donne pas accès aux images clés du flux : l'index retient donc les
+    points de recherche (`seek_points`) pour lesquels un positionnement direct
+    renvoie exactement l'image attendue, ainsi que l'horodatage de chaque image.
+    `get_frame(n)` se positionne sur le point de recherche le plus proche avant `n`
+    puis décode jusqu'à `n`. Les dernières images décodées sont gardées en cache.
+    """
+
+    def __init__(self, video_path: str, seek_points: List[int], timestamps: List[float],
+                 cache_size: int = FRAME_CACHE_SIZE):
+        self.video_path = video_path
+        self.seek_points = sorted(set(seek_points) | {0})
+        self.timestamps = timestamps
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cap = None
+        self._next_frame = 0
+
+    @property
+    def frame_count(self) -> int:
+        """Nombre d'images réellement décodables dans la vidéo."""
+        return len(self.timestamps)
+
+    @classmethod
+    def build(cls, video_path: str, interval: int = SEEK_INTERVAL) -> "FrameIndex":
+        """
+        Construit l'index en décodant une fois la vidéo.
+
+        Args:
+            video_path (str): Chemin de la vidéo.
+            interval (int): Espacement des points de recherche candidats.
+
+        Returns:
+            FrameIndex: L'index de la vidéo.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Impossible d'ouvrir la vidéo : {video_path}")
+
+        timestamps = []
+        signatures = {}
+        while cap.grab():
+            frame_idx = len(timestamps)
+            timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+            if frame_idx % interval == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    signatures[frame_idx] = frame_signature(frame)
+        cap.release()
+
+        # Ne garde que les candidats où le positionnement direct est exact
+        seek_points = [0]
+        cap = cv2.VideoCapture(video_path)
+        for frame_idx, signature in signatures.items():
+            if frame_idx == 0:
+                continue
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if ret and frame_signature(frame) == signature:
+                seek_points.append(frame_idx)
+        cap.release()
+
+        return cls(video_path, seek_points, timestamps)
+
+    @classmethod
+    def load_cached(cls, video_path: str, cache_dir: str = INDEX_CACHE_DIR) -> Optional["FrameIndex"]:
+        """
+        Charge l'index depuis le cache disque, sans le construire.
+
+        Le cache est invalidé si la taille ou la date de modification de la vidéo a changé.
+
+        Returns:
+            FrameIndex: L'index, ou None s'il n'y a pas d'index valide en cache.
+        """
+        cache_path = _cache_path(video_path, cache_dir)
+        if not cache_path.exists():
+            return None
+        try:
+            signature = _file_signature(video_path)
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if all(data.get(key) == value for key, value in signature.items()):
+                return cls(video_path, data["seek_points"], data["timestamps"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    @classmethod
+    def load_or_build(cls, video_path: str, cache_dir: str = INDEX_CACHE_DIR) -> "FrameIndex":
+        """
+        Charge l'index depuis le cache disque, ou le construit et l'enregistre.
+
+        Le cache est invalidé si la taille ou la date de modification de la vidéo a changé.
+        """
+        index = cls.load_cached(video_path, cache_dir)
+        if index is not None:
+            return index
+
+        cache_path = _cache_path(video_path, cache_dir)
+        signature = _file_signature(video_path)
+        index = cls.build(video_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({**signature, "seek_points": index.seek_points, "timestamps": index.timestamps}, f)
+        return index
+
+    def timestamp(self, n: int) -> float:
+        """Horodatage de l'image `n` en millisecondes."""
+        return self.timestamps[n]
+
+    def get_frame(self, n: int) -> np.ndarray:
+        """
+        Retourne l'image `n` de la vidéo.
+
+        Les accès séquentiels poursuivent le décodage en cours ; les autres repartent
+        du point de recherche le plus proche.
+
+        Raises:
+            IndexError: Si `n` est hors de la vidéo.
+        """
+        if not 0 <= n < self.frame_count:
+            raise IndexError(f"Image {n} hors de la vidéo ({self.frame_count} images)")
+
+        if n in self._cache:
+            self._cache.move_to_end(n)
+            return self._cache[n]
+
+        seek_point = self.seek_points[bisect.bisect_right(self.seek_points, n) - 1]
+        if self._cap is None or not seek_point <= self._next_frame <= n:
+            self._seek(seek_point)
+
+        while self._next_frame < n:
+            if not self._cap.grab():
+                raise IndexError(f"Impossible de décoder l'image {n}")
+            self._next_frame += 1
+
+        ret, frame = self._cap.read()
+        if not ret:
+            raise IndexError(f"Impossible de décoder l'image {n}")
+        self._next_frame += 1
+
+        self._cache[n] = frame
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return frame
+
+    def _seek(self, frame_idx: int):
+        """Positionne la capture sur un point de recherche."""
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self.video_path)
+            self._next_frame = 0
+        if frame_idx != self._next_frame:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            self._next_frame = frame_idx
+
+    def close(self):
+        """Libère la capture vidéo et vide le cache d'images."""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._cache.clear()
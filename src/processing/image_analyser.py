@@ -9,8 +9,13 @@ License: MIT License
 """
 import cv2
 import numpy as np
-from skimage.filters import threshold_otsu
-from typing import Dict
+from typing import Dict, List, Union
+
+Threshold = Union[float, str]
+DEFAULT_THRESHOLD = 1
+ADAPTIVE_BLOCK_SIZE = 11
+ADAPTIVE_OFFSET = -2
+SIGNATURE_STRIDE = 2
 
 
 def convert_to_grayscale(frame: np.ndarray) -> np.ndarray:
@@ -18,48 +23,173 @@ def convert_to_grayscale(frame: np.ndarray) -> np.ndarray:
     return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
 
-def binarize_image(gray_frame: np.ndarray, threshold: float) -> np.ndarray:
-    """Binarise une image en niveau de gris avec un seuil donné."""
-    _, binary = cv2.threshold(gray_frame, threshold, 255, cv2.THRESH_BINARY)
+def binarize_image(gray_frame: np.ndarray, threshold: Threshold, dst: np.ndarray = None) -> np.ndarray:
+    """
+    Binarise une image en niveau de gris.
+
+    Le seuil est soit une valeur fixe, soit "otsu" (seuil calculé par la méthode
+    d'Otsu), soit "adaptive" (seuil local égal à la moyenne du voisinage).
+    """
+    if threshold == "otsu":
+        _, binary = cv2.threshold(gray_frame, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)
+    elif threshold == "adaptive":
+        binary = cv2.adaptiveThreshold(gray_frame, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                       ADAPTIVE_BLOCK_SIZE, ADAPTIVE_OFFSET, dst=dst)
+    else:
+        _, binary = cv2.threshold(gray_frame, float(threshold), 255, cv2.THRESH_BINARY, dst=dst)
     return binary
 
 
+def threshold_label(threshold: Threshold) -> str:
+    """Nom court d'un seuil, utilisé pour nommer les jeux de résultats."""
+    if isinstance(threshold, str):
+        return threshold
+    return f"{threshold:g}"
+
+
+def parse_thresholds(text: str) -> List[Threshold]:
+    """Convertit une liste de seuils séparés par des virgules ("1, 20, otsu") en liste Python."""
+    thresholds = []
+    for item in text.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        if item in ("otsu", "adaptive"):
+            thresholds.append(item)
+        else:
+            value = float(item)
+            thresholds.append(int(value) if value.is_integer() else value)
+    return thresholds
+
+
 def extract_contour_areas(binary_image: np.ndarray) -> list:
     """Extrait les aires des contours détectés dans une image binaire."""
     contours, _ = cv2.findContours(binary_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     return [cv2.contourArea(c) for c in contours]
 
 
-def analyse_image(frame: np.ndarray, scale: float = 1.0) -> Dict[str, float]:
+class AnalysisBuffers:
     """
-    Analyse une image pour détecter les bulles et retourner des statistiques.
-    
+    Tampons de travail réutilisés d'une image à l'autre.
+
+    Les images en niveau de gris et binaire sont allouées une seule fois par
+    résolution de vidéo puis passées aux fonctions OpenCV via `dst=`.
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.gray = None
+        self.binary = None
+
+    def ensure(self, shape: tuple):
+        """(Ré)alloue les tampons si la résolution a changé."""
+        if self.gray is None or self.gray.shape != shape[:2]:
+            self.gray = np.empty(shape[:2], dtype=np.uint8)
+            self.binary = np.empty(shape[:2], dtype=np.uint8)
+
+
+def _grayscale(frame: np.ndarray, buffers: AnalysisBuffers) -> np.ndarray:
+    """Image en niveau de gris : l'image elle-même si elle a été décodée en luminance seule."""
+    buffers.ensure(frame.shape)
+    if frame.ndim == 2:
+        return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffers.gray)
+
+
+def binary_signature(binary: np.ndarray) -> np.ndarray:
+    """
+    Empreinte d'une image binaire : un pixel sur `SIGNATURE_STRIDE` dans chaque direction.
+
+    Les pixels sont échantillonnés sans moyenne, de sorte que les films fins entre
+    les bulles restent visibles dans l'empreinte. Il s'agit d'une vue de l'image :
+    elle doit être copiée pour être conservée.
+    """
+    return binary[::SIGNATURE_STRIDE, ::SIGNATURE_STRIDE]
+
+
+def signature_change(signature: np.ndarray, reference: np.ndarray) -> float:
+    """Proportion des pixels binaires de l'empreinte qui diffèrent de la référence."""
+    return np.count_nonzero(signature != reference) / signature.size
+
+
+def bubble_statistics(binary: np.ndarray, scale: float = 1.0) -> Dict[str, float]:
+    """
+    Calcule le nombre de bulles, leur surface moyenne et l'écart type sur une image binaire.
+
     Args:
-        frame (np.ndarray): Image en couleur (BGR).
+        binary (np.ndarray): Image binaire.
         scale (float): Rapport de conversion pixels -> unité réelle (optionnel).
 
     Returns:
         dict: Dictionnaire contenant nb de bulles, surface moyenne et écart type.
     """
-    gray = convert_to_grayscale(frame)
-    threshold = threshold_otsu(gray)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    _, thresh = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-    
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    areas_px = [cv2.contourArea(c) for c in contours]
-    areas_px.pop(0)
+    # Le premier contour (bord de l'image) est ignoré
+    nb_bulles = max(len(contours) - 1, 0)
+    areas = np.fromiter((cv2.contourArea(contours[i]) for i in range(1, len(contours))),
+                        dtype=np.float64, count=nb_bulles)
     
     scale_factor = (1 / (scale ** 2)) if scale > 0 else 1
-    areas_cm = [a * scale_factor for a in areas_px]
+    areas *= scale_factor
 
-    nb_bulles = len(areas_cm)
-    moyenne = float(np.average(areas_cm)) if areas_cm else 0.0
-    ecart_type = float(np.std(areas_cm)) if areas_cm else 0.0
+    moyenne = float(areas.mean()) if nb_bulles else 0.0
+    ecart_type = float(areas.std()) if nb_bulles else 0.0
 
     return {
         "nb_bulles": nb_bulles,
         "surface_moyenne[mm²]": moyenne,
         "ecart_type[mm²]": ecart_type
     }
+
+
+def analyse_image(frame: np.ndarray, scale: float = 1.0, buffers: AnalysisBuffers = None,
+                  threshold: Threshold = DEFAULT_THRESHOLD) -> Dict[str, float]:
+    """
+    Analyse une image pour détecter les bulles et retourner des statistiques.
+    
+    Args:
+        frame (np.ndarray): Image en couleur (BGR) ou en niveau de gris.
+        scale (float): Rapport de conversion pixels -> unité réelle (optionnel).
+        buffers (AnalysisBuffers): Tampons de travail à réutiliser (optionnel).
+        threshold (float or str): Seuil de binarisation, "otsu" ou "adaptive" (optionnel).
+
+    Returns:
+        dict: Dictionnaire contenant nb de bulles, surface moyenne et écart type.
+    """
+    return bubble_statistics(binarize_frame(frame, threshold, buffers), scale)
+
+
+def binarize_frame(frame: np.ndarray, threshold: Threshold = DEFAULT_THRESHOLD,
+                   buffers: AnalysisBuffers = None) -> np.ndarray:
+    """Convertit une image en niveau de gris si besoin puis la binarise dans les tampons de travail."""
+    if buffers is None:
+        buffers = AnalysisBuffers()
+    gray = _grayscale(frame, buffers)
+    return binarize_image(gray, threshold, dst=buffers.binary)
+
+
+def analyse_image_sweep(frame: np.ndarray, thresholds: List[Threshold], scale: float = 1.0,
+                        buffers: AnalysisBuffers = None) -> Dict[str, Dict[str, float]]:
+    """
+    Analyse une image pour plusieurs seuils de binarisation.
+
+    L'image n'est convertie en niveau de gris qu'une fois ; chaque seuil réutilise
+    ensuite le même tampon binaire.
+
+    Args:
+        frame (np.ndarray): Image en couleur (BGR) ou en niveau de gris.
+        thresholds (list): Seuils fixes, "otsu" ou "adaptive".
+        scale (float): Rapport de conversion pixels -> unité réelle (optionnel).
+        buffers (AnalysisBuffers): Tampons de travail à réutiliser (optionnel).
+
+    Returns:
+        dict: Statistiques de l'image pour chaque seuil, indexées par `threshold_label`.
+    """
+    if buffers is None:
+        buffers = AnalysisBuffers()
+    gray = _grayscale(frame, buffers)
+    return {
+        threshold_label(threshold): bubble_statistics(binarize_image(gray, threshold, dst=buffers.binary), scale)
+        for threshold in thresholds
+    }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: job_queue.py
+Author: Maxime Gosselin
+Description: This script implements a SQLite job queue to analyse videos on several machines sharing a filesystem
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video TEXT NOT NULL,
+    excel TEXT,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    warnings TEXT
+)
+"""
+
+
+class JobQueue:
+    """
+    File de tâches d'analyse stockée dans une base SQLite.
+
+    Un coordinateur ajoute les tâches (vidéo, classeur de référence, paramètres) ;
+    les workers, sur cette machine ou sur d'autres partageant le système de
+    fichiers, réservent une tâche pour une durée limitée (bail) qu'ils renouvellent
+    pendant l'analyse. Une tâche dont le bail expire (worker arrêté) est reprise
+    par un autre worker, dans la limite de `max_attempts` tentatives.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            # Bases créées avant l'ajout des avertissements
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "warnings" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN warnings TEXT")
+
+    @contextmanager
+    def _connect(self):
+        """Ouvre une connexion en mode autocommit, fermée en sortie de bloc."""
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, video: str, excel: Optional[str], params: Dict) -> int:
+        """Ajoute une tâche et retourne son identifiant."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (video, excel, params) VALUES (?, ?, ?)",
+                (video, excel, json.dumps(params)),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        """
+        Réserve la prochaine tâche disponible pour `worker`.
+
+        Returns:
+            dict or None: La tâche réservée, None s'il n'y en a aucune.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'bail expiré' "
+                    "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, self.max_attempts),
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'pending' "
+                    "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ? "
+                    "WHERE id = ?",
+                    (worker, now + lease_seconds, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job.update(status="running", attempts=row["attempts"] + 1, worker=worker, lease_until=now + lease_seconds)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def renew(self, job_id: int, worker: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Prolonge le bail d'une tâche. Retourne False si la tâche a été reprise par un autre worker."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: str, warnings: Optional[List[str]] = None):
+        """
+        Marque une tâche comme terminée avec le chemin de ses résultats.
+
+        Les avertissements (erreurs non bloquantes, par exemple une feuille du classeur
+        de référence illisible) sont enregistrés avec la tâche, une ligne par message.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, warnings = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ?",
+                (result, "\n".join(warnings) if warnings else None, job_id, worker),
+            )
+
+    def fail(self, job_id: int, worker: str, error: str):
+        """Enregistre l'échec d'une tâche ; elle est remise en file s'il reste des tentatives."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "error = ?, lease_until = NULL WHERE id = ? AND worker = ?",
+                (self.max_attempts, error, job_id, worker),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de tâches par statut."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def jobs(self) -> List[Dict]:
+        """Toutes les tâches, dans l'ordre d'ajout."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: live_analyser.py
+Author: Maxime Gosselin
+Description: This script follows a recording while it is being acquired and analyses new frames incrementally
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import os
+import re
+import threading
+import time
+import cv2
+import numpy as np
+from typing import List, Dict, Tuple
+from processing.image_analyser import analyse_image, AnalysisBuffers
+from processing.frame_index import frame_signature
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+POLL_TIME_BUDGET = 0.1
+POLL_INTERVAL = 0.1
+READ_CHUNK = 5
+
+
+def natural_key(name: str) -> list:
+    """Clé de tri naturel : "img2.png" avant "img10.png"."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name.lower())]
+
+
+class VideoFileSource:
+    """
+    Suit un fichier vidéo en cours d'écriture.
+
+    Lorsque la fin provisoire du fichier est atteinte, la capture est fermée. Elle
+    n'est rouverte que si la taille du fichier a changé depuis son ouverture. Pour
+    reprendre la lecture, la capture est positionnée avec `CAP_PROP_POS_FRAMES` sur la
+    dernière image lue, dont l'empreinte est vérifiée comme dans `FrameIndex.build` ;
+    si elle diffère, les images déjà lues sont sautées une à une avec `grab`.
+
+    La dernière image lue avant la fin provisoire peut être tronquée : une image
+    n'est retournée qu'une fois la suivante lue, sauf pour la lecture finale.
+    """
+
+    def __init__(self, video_path: str):
+        self.path = video_path
+        self.next_index = 0
+        self._cap = None
+        self._pending = None
+        self._size = None
+        self._last_signature = None
+
+    def read_new(self, max_frames: int, final: bool = False) -> List[Tuple[int, np.ndarray]]:
+        """
+        Retourne au plus `max_frames` nouvelles images sous la forme (index, image).
+
+        Avec `final`, l'enregistrement est terminé et la dernière image est aussi retournée.
+        """
+        if self._cap is None:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return []
+            if size == self._size and not final:
+                # Rien n'a été écrit depuis la dernière fin provisoire
+                return []
+            self._cap = self._reopen()
+            if self._cap is None:
+                return []
+            self._size = size
+
+        frames = []
+        while len(frames) < max_frames:
+            ret, frame = self._cap.read()
+            if not ret:
+                if final and self._pending is not None:
+                    frames.append((self.next_index, self._pending))
+                    self.next_index += 1
+                # Fin provisoire du fichier : il sera rouvert lorsqu'il aura grandi et
+                # l'image en attente relue
+                self.close()
+                break
+            if self._pending is not None:
+                frames.append((self.next_index, self._pending))
+                self.next_index += 1
+            self._pending = frame
+        if frames:
+            self._last_signature = frame_signature(frames[-1][1])
+        return frames
+
+    def _reopen(self):
+        """Ouvre la vidéo positionnée juste après la dernière image retournée, ou None."""
+        cap = cv2.VideoCapture(self.path)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        if self.next_index == 0:
+            return cap
+
+        cap.set(cv2.CAP_PROP_POS_FRAMES, self.next_index - 1)
+        ret, frame = cap.read()
+        if ret and frame_signature(frame) == self._last_signature:
+            return cap
+
+        # Positionnement inexact : on repart du début
+        cap.release()
+        cap = cv2.VideoCapture(self.path)
+        for _ in range(self.next_index):
+            if not cap.grab():
+                # Le fichier n'a pas encore été réécrit jusqu'à la position attendue
+                cap.release()
+                return None
+        return cap
+
+    def close(self):
+        """Libère la capture vidéo en cours."""
+        self._pending = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageDirectorySource:
+    """
+    Suit un dossier qui se remplit d'images, triées par nom de fichier (tri naturel).
+
+    Les fichiers modifiés depuis moins de `settle_time` secondes sont ignorés
+    pour ne pas lire une image en cours d'écriture.
+    """
+
+    def __init__(self, directory: str, settle_time: float = 0.2):
+        self.path = directory
+        self.settle_time = settle_time
+        self.next_index = 0
+        self._seen = set()
+
+    def read_new(self, max_frames: int, final: bool = False) -> List[Tuple[int, np.ndarray]]:
+        """Retourne au plus `max_frames` nouvelles images sous la forme (index, image)."""
+        now = time.time()
+        names = sorted(
+            (f for f in os.listdir(self.path)
+             if f.lower().endswith(IMAGE_EXTENSIONS) and f not in self._seen),
+            key=natural_key
+        )
+
+        frames = []
+        for name in names:
+            if len(frames) >= max_frames:
+                break
+            file_path = os.path.join(self.path, name)
+            try:
+                if now - os.path.getmtime(file_path) < self.settle_time:
+                    break
+            except OSError:
+                break
+            frame = cv2.imread(file_path)
+            if frame is None:
+                # Image incomplète : on réessaiera au prochain appel
+                break
+            self._seen.add(name)
+            frames.append((self.next_index, frame))
+            self.next_index += 1
+        return frames
+
+    def close(self):
+        """Aucune ressource à libérer pour un dossier."""
+
+
+def open_live_source(path: str):
+    """Retourne la source adaptée au chemin : dossier d'images ou fichier vidéo."""
+    if os.path.isdir(path):
+        return ImageDirectorySource(path)
+    return VideoFileSource(path)
+
+
+class LiveAnalyser:
+    """
+    Analyse incrémentale d'un enregistrement en cours d'acquisition.
+
+    Chaque appel à `poll` lit et analyse de nouvelles images pendant au plus
+    `time_budget` secondes (plus la durée d'un lot de `READ_CHUNK` images). `start`
+    lance ces appels dans un thread d'arrière-plan ; l'interface récupère alors les
+    nouveaux résultats avec `take_new_results` sans jamais attendre le décodage.
+    """
+
+    def __init__(self, path: str, step: int = 1, scale: float = 1.0, agitation: int = 0,
+                 time_budget: float = POLL_TIME_BUDGET):
+        self.path = path
+        self.step = step
+        self.scale = scale
+        self.agitation = agitation
+        self.time_budget = time_budget
+        self.source = open_live_source(path)
+        self.results: List[Dict[str, float]] = []
+        self.buffers = AnalysisBuffers()
+        self.error = None
+        self._unread: List[Dict[str, float]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def frames_read(self) -> int:
+        """Nombre d'images lues depuis le début de l'enregistrement."""
+        return self.source.next_index
+
+    def matches(self, step: int, scale: float, agitation: int) -> bool:
+        """Indique si les résultats ont été calculés avec ces paramètres."""
+        return (self.step, self.scale, self.agitation) == (step, scale, agitation)
+
+    def poll(self, final: bool = False) -> List[Dict[str, float]]:
+        """
+        Analyse les nouvelles images disponibles, dans la limite du budget de temps.
+
+        Args:
+            final (bool): L'enregistrement est terminé, toutes les images sont complètes.
+
+        Returns:
+            list: Résultats des images analysées lors de cet appel.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        new_results = []
+        while True:
+            frames = self.source.read_new(READ_CHUNK, final)
+            for frame_idx, frame in frames:
+                if frame_idx > self.agitation and frame_idx % self.step == 0:
+                    result = analyse_image(frame, scale=self.scale, buffers=self.buffers)
+                    result["frame"] = frame_idx
+                    new_results.append(result)
+            if not frames or time.perf_counter() >= deadline:
+                break
+
+        with self._lock:
+            self.results.extend(new_results)
+            self._unread.extend(new_results)
+        return new_results
+
+    def start(self, interval: float = POLL_INTERVAL):
+        """
+        Suit l'enregistrement dans un thread d'arrière-plan.
+
+        Args:
+            interval (float): Attente en secondes lorsqu'aucune nouvelle image n'est disponible.
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._follow, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _follow(self, interval: float):
+        """Boucle du thread de suivi."""
+        while not self._stop_event.is_set():
+            read_before = self.frames_read
+            try:
+                self.poll()
+            except Exception as e:
+                self.error = e
+                return
+            if self.frames_read == read_before:
+                self._stop_event.wait(interval)
+
+    def take_new_results(self) -> List[Dict[str, float]]:
+        """
+        Retourne les résultats calculés depuis l'appel précédent.
+
+        Raises:
+            Exception: L'erreur qui a interrompu le suivi en arrière-plan.
+        """
+        if self.error is not None:
+            raise self.error
+        with self._lock:
+            new_results, self._unread = self._unread, []
+        return new_results
+
+    def _join(self):
+        """Arrête le thread de suivi et attend la fin de l'appel en cours."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def finish(self) -> List[Dict[str, float]]:
+        """Analyse toutes les images restantes puis libère la source."""
+        self._join()
+        while True:
+            read_before = self.frames_read
+            self.poll(final=True)
+            if self.frames_read == read_before:
+                break
+        self.source.close()
+        return self.results
+
+    def stop(self):
+        """Arrête le suivi sans perdre les résultats déjà calculés."""
+        self._join()
+        self.source.close()
@@ -20,3 +20,9 @@ def load_settings():
 def save_settings(data):
     with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
+
+def load_analysis_options():
+    return load_settings().get("analysis", {})
+
+def load_export_options():
+    return load_settings().get("export", {})
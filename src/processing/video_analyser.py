@@ -8,43 +8,265 @@ Contact: maximeg391@gmail.com
 License: MIT License
 """
 import os
-import cv2
-from typing import List, Dict
-from processing.image_analyser import analyse_image
+import queue
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Dict, Tuple
+from processing.video_capture import open_capture, resolve_decode_options
+from processing.image_analyser import (
+    analyse_image, analyse_image_sweep, binarize_frame, binary_signature, bubble_statistics,
+    signature_change, threshold_label, AnalysisBuffers, Threshold, DEFAULT_THRESHOLD
+)
 
+REUSED_COLUMN = "image_reutilisee"
 
-def analyse_video(video_path: str, step: int = 1, scale: float = 1.0, agitation: int = 0) -> List[Dict[str, float]]:
+
+def analyse_video(video_path: str, step: int = 1, scale: float = 1.0, agitation: int = 0,
+                  workers: int = 1, queue_size: int = 8, threshold: Threshold = DEFAULT_THRESHOLD,
+                  change_tolerance: float = None, decode: Dict = None) -> List[Dict[str, float]]:
     """
     Analyse une vidéo image par image à une fréquence donnée.
 
+    Les images décodées et les tampons de travail sont réutilisés d'une image à
+    l'autre, sans allocation par image. Avec `workers` > 1, le décodage et
+    l'analyse se chevauchent : un thread décode les images dans une file bornée
+    et un pool de threads les analyse. Les résultats sont réassemblés dans
+    l'ordre des images.
+
+    Avec `change_tolerance`, une image binaire dont moins de cette proportion de
+    pixels diffère de la dernière image analysée (comparaison sur un pixel sur
+    `SIGNATURE_STRIDE`, sans moyenne, pour conserver les films fins) reprend
+    les statistiques de cette dernière ; la colonne "image_reutilisee" l'indique.
+    Cette comparaison dépend de l'image précédente : l'analyse est alors séquentielle.
+
     Args:
         video_path (str): Chemin de la vidéo.
-        fps_results (float): Nombre d'images à analyser par seconde.
+        step (int): Intervalle entre deux images analysées.
         scale (float): Facteur d'échelle à appliquer sur les résultats.
+        agitation (int): Nombre d'images ignorées au début de la vidéo.
+        workers (int): Nombre de threads d'analyse (1 = exécution séquentielle).
+        queue_size (int): Nombre maximal d'images décodées en attente d'analyse.
+        threshold (float or str): Seuil de binarisation, "otsu" ou "adaptive".
+        change_tolerance (float): Proportion de pixels modifiés sous laquelle une image
+            est considérée identique à la précédente (None = toutes les images sont analysées).
+        decode (dict): Options de décodage (backend, threads, grayscale, self_test), voir `resolve_decode_options`.
 
     Returns:
         list: Liste de dictionnaires contenant les mesures pour chaque image.
     """
-    cap = cv2.VideoCapture(video_path)
+    if change_tolerance is not None:
+        analyse_frame = _change_gated_analyser(scale, threshold, change_tolerance)
+        workers = 1
+    else:
+        def analyse_frame(frame, buffers):
+            return analyse_image(frame, scale=scale, buffers=buffers, threshold=threshold)
+
+    results = []
+    for frame_idx, result in _analyse_frames(video_path, step, agitation, analyse_frame, workers, queue_size,
+                                             decode, [threshold]):
+        result["frame"] = frame_idx
+        results.append(result)
+    return results
+
+
+def count_reused(results: List[Dict[str, float]]) -> int:
+    """Nombre d'images dont les statistiques ont été reprises de l'image précédente."""
+    return sum(1 for result in results if result.get(REUSED_COLUMN))
+
+
+def _change_gated_analyser(scale: float, threshold: Threshold, tolerance: float) -> Callable:
+    """
+    Retourne une fonction d'analyse qui réutilise les statistiques de la dernière
+    image analysée lorsque l'image binaire a peu changé.
+    """
+    last = {"signature": None, "result": None}
+
+    def analyse_frame(frame, buffers):
+        binary = binarize_frame(frame, threshold, buffers)
+        signature = binary_signature(binary)
+        if last["signature"] is not None and signature_change(signature, last["signature"]) < tolerance:
+            return {**last["result"], REUSED_COLUMN: True}
+
+        if last["signature"] is None or last["signature"].shape != signature.shape:
+            last["signature"] = signature.copy()
+        else:
+            np.copyto(last["signature"], signature)
+        last["result"] = bubble_statistics(binary, scale)
+        return {**last["result"], REUSED_COLUMN: False}
+
+    return analyse_frame
+
+
+def analyse_video_sweep(video_path: str, thresholds: List[Threshold], step: int = 1, scale: float = 1.0,
+                        agitation: int = 0, workers: int = 1, queue_size: int = 8,
+                        decode: Dict = None) -> Dict[str, List[Dict[str, float]]]:
+    """
+    Analyse une vidéo pour plusieurs seuils de binarisation en un seul décodage.
+
+    Chaque image est décodée et convertie en niveau de gris une seule fois, puis
+    binarisée et analysée pour chacun des seuils.
+
+    Args:
+        video_path (str): Chemin de la vidéo.
+        thresholds (list): Seuils fixes, "otsu" ou "adaptive".
+        step (int): Intervalle entre deux images analysées.
+        scale (float): Facteur d'échelle à appliquer sur les résultats.
+        agitation (int): Nombre d'images ignorées au début de la vidéo.
+        workers (int): Nombre de threads d'analyse (1 = exécution séquentielle).
+        queue_size (int): Nombre maximal d'images décodées en attente d'analyse.
+        decode (dict): Options de décodage (backend, threads, grayscale, self_test), voir `resolve_decode_options`.
+
+    Returns:
+        dict: Pour chaque seuil (voir `threshold_label`), la liste des mesures par image.
+    """
+    def analyse_frame(frame, buffers):
+        return analyse_image_sweep(frame, thresholds, scale=scale, buffers=buffers)
+
+    sweep = {threshold_label(threshold): [] for threshold in thresholds}
+    for frame_idx, by_threshold in _analyse_frames(video_path, step, agitation, analyse_frame, workers, queue_size,
+                                                   decode, thresholds):
+        for label, result in by_threshold.items():
+            result["frame"] = frame_idx
+            sweep[label].append(result)
+    return sweep
+
+
+def _analyse_frames(video_path: str, step: int, agitation: int, analyse_frame: Callable,
+                    workers: int, queue_size: int, decode: Dict = None,
+                    thresholds: List[Threshold] = (DEFAULT_THRESHOLD,)) -> List[Tuple[int, Any]]:
+    """
+    Décode la vidéo et applique `analyse_frame(image, tampons)` aux images sélectionnées.
+
+    Les options de décodage sont résolues par `resolve_decode_options` (mesure de la
+    combinaison la plus rapide au premier passage si elle est demandée).
+
+    Returns:
+        list: Couples (index de l'image, résultat), dans l'ordre des images.
+    """
+    decode = resolve_decode_options(video_path, decode, thresholds)
+    cap = open_capture(video_path, thresholds=thresholds, **decode)
     if not cap.isOpened():
         raise FileNotFoundError(f"Impossible d'ouvrir la vidéo : {video_path}")
 
-    results = []
+    try:
+        if workers > 1:
+            return _analyse_pipelined(cap, step, agitation, analyse_frame, workers, queue_size)
+
+        results = []
+        frame_idx = 0
+        buffers = AnalysisBuffers()
+
+        while True:
+            ret, frame = cap.read(buffers.frame)
+            if not ret:
+                break
+            buffers.frame = frame
+
+            if frame_idx > agitation and frame_idx % step == 0:
+                results.append((frame_idx, analyse_frame(frame, buffers)))
+
+            frame_idx += 1
+
+        return results
+    finally:
+        cap.release()
+
+
+def _decode_frames(cap, step: int, agitation: int, frames: queue.Queue, free_frames: queue.Queue,
+                   stop: threading.Event):
+    """
+    Décode la vidéo et place les images à analyser dans la file, terminée par None.
+
+    Les images sont décodées dans les tampons rendus par les threads d'analyse
+    (`free_frames`) ; un nouveau tampon n'est alloué que si aucun n'est libre. Si le
+    décodage échoue, la file est terminée par l'exception au lieu de None.
+    """
     frame_idx = 0
+    buffer = None
+    end = None
+    try:
+        while not stop.is_set():
+            if buffer is None:
+                try:
+                    buffer = free_frames.get_nowait()
+                except queue.Empty:
+                    pass
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+            ret, frame = cap.read(buffer)
+            if not ret:
+                break
 
-        if frame_idx > agitation and frame_idx % step == 0:
-            result = analyse_image(frame, scale=scale)
-            result["frame"] = frame_idx
-            results.append(result)
+            if frame_idx > agitation and frame_idx % step == 0:
+                frames.put((frame_idx, frame))
+                buffer = None
+            else:
+                buffer = frame
+
+            frame_idx += 1
+    except Exception as e:
+        # Relancée par `_analyse_pipelined`, comme en mode séquentiel
+        end = e
+    finally:
+        frames.put(end)
+
+
+def _analyse_pipelined(cap, step: int, agitation: int, analyse_frame: Callable,
+                       workers: int, queue_size: int) -> List[Tuple[int, Any]]:
+    """Analyse la vidéo avec un thread de décodage et un pool de threads d'analyse."""
+    frames = queue.Queue(maxsize=max(1, queue_size))
+    free_frames = queue.Queue()
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode_frames, args=(cap, step, agitation, frames, free_frames, stop),
+                               daemon=True)
+    decoder.start()
+
+    results = []
+    pending = deque()
+    local = threading.local()
+
+    def analyse(frame):
+        # Chaque thread d'analyse garde ses propres tampons de travail
+        if not hasattr(local, "buffers"):
+            local.buffers = AnalysisBuffers()
+        try:
+            return analyse_frame(frame, local.buffers)
+        finally:
+            free_frames.put(frame)
+
+    def collect():
+        frame_idx, future = pending.popleft()
+        results.append((frame_idx, future.result()))
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                item = frames.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                frame_idx, frame = item
+                pending.append((frame_idx, pool.submit(analyse, frame)))
+
+                # Limite le nombre d'images en cours d'analyse pour borner la mémoire
+                if len(pending) >= 2 * workers:
+                    collect()
 
-        frame_idx += 1
+            while pending:
+                collect()
+    finally:
+        stop.set()
+        # Vide la file pour débloquer le décodeur s'il attend de la place
+        while decoder.is_alive():
+            try:
+                frames.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        decoder.join()
 
-    cap.release()
     return results
 
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: video_capture.py
+Author: Maxime Gosselin
+Description: This script opens videos with configurable decode options and selects the fastest working combination
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Sequence
+from processing.image_analyser import binarize_image, threshold_label, Threshold, DEFAULT_THRESHOLD
+
+BACKENDS = {
+    "auto": cv2.CAP_ANY,
+    "ffmpeg": cv2.CAP_FFMPEG,
+    "gstreamer": cv2.CAP_GSTREAMER,
+    "msmf": cv2.CAP_MSMF,
+    "mjpeg": cv2.CAP_OPENCV_MJPEG,
+}
+DEFAULT_DECODE = {"backend": "auto", "threads": 0, "grayscale": False, "self_test": False}
+LUMA_CHECK_FRAMES = 5
+SELF_TEST_FRAMES = 100
+DECODE_CACHE_FILE = os.path.join("cache", "decode_options.json")
+# Plusieurs analyses peuvent tourner en parallèle dans le même processus (service d'analyse)
+_DECODE_CACHE_LOCK = threading.Lock()
+
+
+def _open(video_path: str, backend: str, threads: int) -> cv2.VideoCapture:
+    """Ouvre la vidéo avec le backend et le nombre de threads de décodage demandés."""
+    params = [cv2.CAP_PROP_N_THREADS, int(threads)] if threads else []
+    return cv2.VideoCapture(video_path, BACKENDS.get(backend, cv2.CAP_ANY), params)
+
+
+def _luma_decode_supported(video_path: str, backend: str, threads: int,
+                           thresholds: Sequence[Threshold] = (DEFAULT_THRESHOLD,)) -> bool:
+    """
+    Vérifie que le décodeur peut fournir directement le plan de luminance et que,
+    sur les premières images, sa binarisation est identique à celle de la conversion
+    BGR -> gris pour chacun des seuils utilisés (ce n'est pas le cas des flux en
+    plage limitée, où le noir vaut 16).
+    """
+    color_cap = _open(video_path, backend, threads)
+    luma_cap = _open(video_path, backend, threads)
+    try:
+        if not luma_cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+            return False
+        checked = 0
+        for _ in range(LUMA_CHECK_FRAMES):
+            ret_color, color = color_cap.read()
+            ret_luma, luma = luma_cap.read()
+            if not (ret_color or ret_luma):
+                break
+            if not (ret_color and ret_luma) or luma.ndim != 2 or color.ndim != 3 or luma.shape != color.shape[:2]:
+                return False
+            gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+            for threshold in thresholds:
+                if not np.array_equal(binarize_image(gray, threshold), binarize_image(luma, threshold)):
+                    return False
+            checked += 1
+        return checked > 0
+    finally:
+        color_cap.release()
+        luma_cap.release()
+
+
+def open_capture(video_path: str, backend: str = "auto", threads: int = 0, grayscale: bool = False,
+                 thresholds: Sequence[Threshold] = (DEFAULT_THRESHOLD,)) -> cv2.VideoCapture:
+    """
+    Ouvre une vidéo avec les options de décodage demandées.
+
+    Si le backend ou le nombre de threads n'est pas utilisable pour ce fichier, la
+    vidéo est ouverte avec les options par défaut. Le décodage en niveau de gris
+    n'est activé que si le plan de luminance du décodeur donne la même image binaire
+    que la conversion BGR -> gris aux seuils utilisés ; les images lues sont alors
+    en un seul canal.
+
+    Args:
+        video_path (str): Chemin de la vidéo.
+        backend (str): Backend préféré ("auto", "ffmpeg", "gstreamer", "msmf", "mjpeg").
+        threads (int): Nombre de threads du décodeur (0 = choix du backend).
+        grayscale (bool): Décoder uniquement la luminance lorsque c'est possible.
+        thresholds (list): Seuils de binarisation de l'analyse, pour valider le décodage en luminance.
+
+    Returns:
+        cv2.VideoCapture: La capture ouverte (à tester avec `isOpened`).
+    """
+    cap = _open(video_path, backend, threads)
+    if not cap.isOpened() and (backend != "auto" or threads):
+        cap.release()
+        backend, threads = "auto", 0
+        cap = cv2.VideoCapture(video_path)
+
+    if grayscale and cap.isOpened() and _luma_decode_supported(video_path, backend, threads, thresholds):
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+    return cap
+
+
+def resolve_decode_options(video_path: str, decode: Dict = None,
+                           thresholds: Sequence[Threshold] = (DEFAULT_THRESHOLD,)) -> Dict:
+    """
+    Options de décodage à utiliser pour une vidéo au début de son analyse.
+
+    Sans `self_test`, ce sont les options des paramètres. Avec `self_test`, la
+    combinaison la plus rapide est mesurée par `select_decode_options` puis mise en
+    cache pour ce fichier (chemin, taille, date de modification et seuils).
+
+    Args:
+        video_path (str): Chemin de la vidéo.
+        decode (dict): Options des paramètres ("backend", "threads", "grayscale", "self_test").
+        thresholds (list): Seuils de binarisation de l'analyse.
+
+    Returns:
+        dict: Options ("backend", "threads", "grayscale") à passer à `open_capture`.
+    """
+    decode = {**DEFAULT_DECODE, **(decode or {})}
+    if not decode.pop("self_test"):
+        return decode
+
+    stat = os.stat(video_path)
+    key = os.path.abspath(video_path)
+    signature = {"size": stat.st_size, "mtime": stat.st_mtime,
+                 "thresholds": [threshold_label(threshold) for threshold in thresholds]}
+    cache = _load_decode_cache()
+    entry = cache.get(key, {})
+    if all(entry.get(name) == value for name, value in signature.items()) and "decode" in entry:
+        return entry["decode"]
+
+    choice = select_decode_options(video_path, thresholds=thresholds)
+    with _DECODE_CACHE_LOCK:
+        cache = _load_decode_cache()
+        cache[key] = {**signature, "decode": choice}
+        _save_decode_cache(cache)
+    return choice
+
+
+def _load_decode_cache() -> Dict:
+    """Choix de décodage mis en cache, indexés par chemin absolu de vidéo."""
+    try:
+        with open(DECODE_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_decode_cache(cache: Dict):
+    """Enregistre le cache des choix de décodage (écriture atomique)."""
+    path = Path(DECODE_CACHE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def available_backends() -> List[str]:
+    """Backends de `BACKENDS` disponibles dans cette installation d'OpenCV."""
+    stream_backends = set(cv2.videoio_registry.getStreamBackends())
+    return ["auto"] + [name for name, api in BACKENDS.items() if name != "auto" and api in stream_backends]
+
+
+def select_decode_options(video_path: str, max_frames: int = SELF_TEST_FRAMES,
+                          thresholds: Sequence[Threshold] = (DEFAULT_THRESHOLD,)) -> Dict:
+    """
+    Mesure chaque combinaison d'options de décodage sur le début d'une vidéo et
+    retourne la plus rapide parmi celles qui fonctionnent. Une combinaison n'est
+    retenue que si ses premières images binarisées sont identiques à celles du
+    décodage par défaut, pour que le choix ne modifie pas les résultats.
+
+    Le temps mesuré inclut la conversion en niveau de gris pour les modes couleur,
+    afin de comparer les modes à coût d'analyse égal.
+
+    Args:
+        video_path (str): Chemin de la vidéo de test.
+        max_frames (int): Nombre d'images décodées par combinaison.
+        thresholds (list): Seuils de binarisation de l'analyse, pour valider le décodage en luminance.
+
+    Returns:
+        dict: Options ("backend", "threads", "grayscale") à passer à `open_capture`.
+    """
+    cpu_count = os.cpu_count() or 1
+    thread_counts = sorted({0, 1, cpu_count})
+
+    default_cap = cv2.VideoCapture(video_path)
+    reference_binaries = _first_binaries(default_cap, thresholds)
+    default_cap.release()
+
+    best = {"backend": "auto", "threads": 0, "grayscale": False}
+    best_time, reference_frames = None, None
+    for backend in available_backends():
+        for threads in thread_counts:
+            if backend != "auto" and not _open_works(video_path, backend, threads):
+                continue
+            for grayscale in (False, True):
+                if grayscale and not _luma_decode_supported(video_path, backend, threads, thresholds):
+                    continue
+
+                cap = open_capture(video_path, backend, threads, grayscale, thresholds)
+                same_output = _same_binaries(_first_binaries(cap, thresholds), reference_binaries)
+                cap.release()
+                if not same_output:
+                    continue
+
+                cap = open_capture(video_path, backend, threads, grayscale, thresholds)
+                frames, elapsed = _time_decode(cap, max_frames)
+                cap.release()
+
+                if reference_frames is None:
+                    reference_frames = frames
+                if frames == 0 or frames < reference_frames:
+                    continue
+                if best_time is None or elapsed < best_time:
+                    best = {"backend": backend, "threads": threads, "grayscale": grayscale}
+                    best_time = elapsed
+    return best
+
+
+def _open_works(video_path: str, backend: str, threads: int) -> bool:
+    """Indique si la vidéo s'ouvre réellement avec ces options (sans repli)."""
+    cap = _open(video_path, backend, threads)
+    opened = cap.isOpened()
+    cap.release()
+    return opened
+
+
+def _first_binaries(cap: cv2.VideoCapture, thresholds: Sequence[Threshold]) -> List[np.ndarray]:
+    """Binarise les `LUMA_CHECK_FRAMES` premières images de la capture pour chacun des seuils."""
+    binaries = []
+    for _ in range(LUMA_CHECK_FRAMES):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        binaries.extend(binarize_image(gray, threshold) for threshold in thresholds)
+    return binaries
+
+
+def _same_binaries(binaries: List[np.ndarray], reference: List[np.ndarray]) -> bool:
+    """Indique si deux suites d'images binaires sont identiques."""
+    return len(binaries) == len(reference) and all(map(np.array_equal, binaries, reference))
+
+
+def _time_decode(cap: cv2.VideoCapture, max_frames: int) -> tuple:
+    """Décode au plus `max_frames` images (converties en gris si besoin) et mesure le temps écoulé."""
+    frames = 0
+    frame = None
+    gray = None
+    start = time.perf_counter()
+    while frames < max_frames:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        if frame.ndim == 3:
+            if gray is None:
+                gray = np.empty(frame.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        frames += 1
+    return frames, time.perf_counter() - start
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filename: live_view.py
+Author: Maxime Gosselin
+Contact: maximeg391@gmail.com
+License: MIT License
+"""
+from PyQt5 import QtCore
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (
+    QDialog, QFileDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+)
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+
+POLL_INTERVAL_MS = 200
+
+
+class LiveWindow(QDialog):
+    def __init__(self, parent, on_start, on_poll, on_stop):
+        super().__init__(parent)
+        self.setWindowFlags(self.windowFlags()
+                    ^ QtCore.Qt.WindowContextHelpButtonHint)
+
+        self.setWindowTitle("Live analysis")
+        self.resize(700, 500)
+
+        self.on_start = on_start
+        self.on_poll = on_poll
+        self.on_stop = on_stop
+        self.frames = []
+        self.counts = []
+
+        self.layout = QVBoxLayout(self)
+
+        button_layout = QHBoxLayout()
+        self.follow_video_btn = QPushButton("Follow video file")
+        self.follow_video_btn.clicked.connect(self.follow_video)
+        button_layout.addWidget(self.follow_video_btn)
+
+        self.follow_folder_btn = QPushButton("Follow image folder")
+        self.follow_folder_btn.clicked.connect(self.follow_folder)
+        button_layout.addWidget(self.follow_folder_btn)
+
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.clicked.connect(self.stop)
+        button_layout.addWidget(self.stop_btn)
+        self.layout.addLayout(button_layout)
+
+        self.figure = Figure(figsize=(6, 3))
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.axes = self.figure.add_subplot(111)
+        self.line, = self.axes.plot([], [], color="#4472C4")
+        self.axes.set_xlabel("Image")
+        self.axes.set_ylabel("Nombre de bulles")
+        self.layout.addWidget(self.canvas)
+
+        self.stats_label = QLabel("Waiting for a source...")
+        self.layout.addWidget(self.stats_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def follow_video(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Video", "", "Videos (*.avi *.mp4)")
+        if path:
+            self.start(path)
+
+    def follow_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "Select image folder")
+        if path:
+            self.start(path)
+
+    def start(self, path):
+        try:
+            self.on_start(path)
+        except Exception as e:
+            self.stats_label.setText(f"Error: {str(e)}")
+            return
+
+        self.frames = []
+        self.counts = []
+        self.line.set_data([], [])
+        self.canvas.draw_idle()
+        self.stats_label.setText(f"Following: {path}")
+        self.follow_video_btn.setEnabled(False)
+        self.follow_folder_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.timer.start(POLL_INTERVAL_MS)
+
+    def refresh(self):
+        try:
+            new_results = self.on_poll()
+        except Exception as e:
+            self.stop()
+            self.stats_label.setText(f"Error: {str(e)}")
+            return
+        if not new_results:
+            return
+
+        for result in new_results:
+            self.frames.append(result["frame"])
+            self.counts.append(result["nb_bulles"])
+
+        self.line.set_data(self.frames, self.counts)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.canvas.draw_idle()
+
+        last = new_results[-1]
+        self.stats_label.setText(
+            f"Frame {last['frame']} - bubbles: {last['nb_bulles']} - "
+            f"mean area: {last['surface_moyenne[mm²]']:.3f} mm² - "
+            f"std: {last['ecart_type[mm²]']:.3f} mm² ({len(self.frames)} frames analysed)"
+        )
+
+    def stop(self):
+        self.timer.stop()
+        self.on_stop()
+        self.follow_video_btn.setEnabled(True)
+        self.follow_folder_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+
+    def reject(self):
+        if self.timer.isActive():
+            self.stop()
+        super().reject()
@@ -8,11 +8,14 @@ License: MIT License
 """
 from PyQt5 import QtCore
 from PyQt5.QtWidgets import (
-    QDialog, QFileDialog, QVBoxLayout, QLabel, QPushButton,
-    QCheckBox, QScrollArea, QWidget, QTabWidget
+    QDialog, QFileDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QCheckBox, QScrollArea, QWidget, QTabWidget, QSpinBox, QLineEdit, QMessageBox, QDoubleSpinBox,
+    QComboBox
 )
 import pandas as pd
 from processing.settings_manager import load_settings, save_settings
+from processing.image_analyser import parse_thresholds
+from processing.video_capture import available_backends, DEFAULT_DECODE
 
 class SettingsWindow(QDialog):
     def __init__(self, parent=None):
@@ -29,6 +32,71 @@ class SettingsWindow(QDialog):
 
         self.layout = QVBoxLayout(self)
 
+        analysis = self.settings.get("analysis", {})
+
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Analysis threads (1 = sequential):"))
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 64)
+        self.workers_input.setValue(analysis.get("workers", 1))
+        workers_layout.addWidget(self.workers_input)
+        self.layout.addLayout(workers_layout)
+
+        queue_layout = QHBoxLayout()
+        queue_layout.addWidget(QLabel("Decoded frames queue size:"))
+        self.queue_size_input = QSpinBox()
+        self.queue_size_input.setRange(1, 256)
+        self.queue_size_input.setValue(analysis.get("queue_size", 8))
+        queue_layout.addWidget(self.queue_size_input)
+        self.layout.addLayout(queue_layout)
+
+        thresholds_layout = QHBoxLayout()
+        thresholds_layout.addWidget(QLabel("Threshold sweep (e.g. 1, 20, otsu, adaptive):"))
+        self.thresholds_input = QLineEdit()
+        self.thresholds_input.setPlaceholderText("Empty = single analysis with threshold 1")
+        self.thresholds_input.setText(", ".join(str(t) for t in analysis.get("thresholds", [])))
+        thresholds_layout.addWidget(self.thresholds_input)
+        self.layout.addLayout(thresholds_layout)
+
+        tolerance_layout = QHBoxLayout()
+        tolerance_layout.addWidget(QLabel("Skip near-duplicate frames (% of changed pixels, 0 = off):"))
+        self.tolerance_input = QDoubleSpinBox()
+        self.tolerance_input.setRange(0, 100)
+        self.tolerance_input.setDecimals(2)
+        self.tolerance_input.setValue(100 * (analysis.get("change_tolerance") or 0))
+        tolerance_layout.addWidget(self.tolerance_input)
+        self.layout.addLayout(tolerance_layout)
+
+        decode = {**DEFAULT_DECODE, **analysis.get("decode", {})}
+
+        decode_layout = QHBoxLayout()
+        decode_layout.addWidget(QLabel("Decode backend:"))
+        self.backend_input = QComboBox()
+        self.backend_input.addItems(available_backends())
+        self.backend_input.setCurrentText(decode["backend"])
+        decode_layout.addWidget(self.backend_input)
+
+        decode_layout.addWidget(QLabel("Decoder threads (0 = auto):"))
+        self.decode_threads_input = QSpinBox()
+        self.decode_threads_input.setRange(0, 64)
+        self.decode_threads_input.setValue(decode["threads"])
+        decode_layout.addWidget(self.decode_threads_input)
+
+        self.grayscale_checkbox = QCheckBox("Luma-only decode")
+        self.grayscale_checkbox.setChecked(decode["grayscale"])
+        decode_layout.addWidget(self.grayscale_checkbox)
+
+        self.self_test_checkbox = QCheckBox("Auto-detect per video")
+        self.self_test_checkbox.setToolTip("Measure the fastest decoding when a video is first analysed "
+                                           "(the choice is cached per file)")
+        self.self_test_checkbox.setChecked(decode["self_test"])
+        decode_layout.addWidget(self.self_test_checkbox)
+        self.layout.addLayout(decode_layout)
+
+        self.overlay_checkbox = QCheckBox("Add per-video overlay charts")
+        self.overlay_checkbox.setChecked(self.settings.get("export", {}).get("chart_overlay", False))
+        self.layout.addWidget(self.overlay_checkbox)
+
         self.load_button = QPushButton("Select Excel File")
         self.load_button.clicked.connect(self.load_excel)
         self.layout.addWidget(self.load_button)
@@ -87,13 +155,33 @@ class SettingsWindow(QDialog):
 
 
     def save_selection(self):
+        try:
+            thresholds = parse_thresholds(self.thresholds_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Parameters", "Invalid threshold list")
+            return
+
         selection = {}
         for sheet_name, cbs in self.checkboxes.items():
             selected_cols = [cb.text() for cb in cbs if cb.isChecked()]
             if selected_cols:
                 selection[sheet_name] = selected_cols
 
-        self.settings["columns"] = selection
+        if self.checkboxes:
+            self.settings["columns"] = selection
+        self.settings.setdefault("analysis", {}).update({
+            "workers": self.workers_input.value(),
+            "queue_size": self.queue_size_input.value(),
+            "thresholds": thresholds,
+            "change_tolerance": self.tolerance_input.value() / 100 or None,
+            "decode": {
+                "backend": self.backend_input.currentText(),
+                "threads": self.decode_threads_input.value(),
+                "grayscale": self.grayscale_checkbox.isChecked(),
+                "self_test": self.self_test_checkbox.isChecked(),
+            },
+        })
+        self.settings.setdefault("export", {})["chart_overlay"] = self.overlay_checkbox.isChecked()
         save_settings(self.settings)
         self.accept()
 
@@ -9,11 +9,12 @@ License: MIT License
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog,
     QLineEdit, QHBoxLayout, QDateEdit, QListWidget, QSpinBox,
-    QDialog, QMessageBox
+    QDialog, QMessageBox, QInputDialog, QCheckBox, QApplication
 )
 from PyQt5.QtCore import QDate, QPoint, Qt
-from PyQt5.QtGui import QPixmap, QPainter, QPen
+from PyQt5.QtGui import QPixmap, QPainter, QPen, QImage
 from view.settings_view import SettingsWindow
+from view.live_view import LiveWindow
 import math
 import os
 from datetime import datetime
@@ -27,7 +28,12 @@ class VideoAnalyzerUI(QWidget):
         self.on_add_video = None
         self.on_remove_video = None
         self.on_attach_excel = None
+        self.on_get_frame = None
+        self.on_frame_count = None
         self.on_analyze = None
+        self.on_live_start = None
+        self.on_live_poll = None
+        self.on_live_stop = None
 
         self.init_ui()
 
@@ -115,11 +121,24 @@ class VideoAnalyzerUI(QWidget):
         file_layout.addWidget(self.filename_input)
         layout.addLayout(file_layout)
 
+        self.update_checkbox = QCheckBox("Update existing workbook (only new or changed videos)")
+        layout.addWidget(self.update_checkbox)
+
         # Analyze button
         self.analyze_btn = QPushButton("Start analysis")
         self.analyze_btn.clicked.connect(self.start_analysis)
         layout.addWidget(self.analyze_btn)
 
+        # Threshold sweep button (thresholds set in the parameters)
+        self.sweep_btn = QPushButton("Threshold sweep")
+        self.sweep_btn.clicked.connect(lambda: self.start_analysis(sweep=True))
+        layout.addWidget(self.sweep_btn)
+
+        # Live button
+        self.live_btn = QPushButton("Live analysis")
+        self.live_btn.clicked.connect(self.open_live)
+        layout.addWidget(self.live_btn)
+
         # Status label
         self.status_label = QLabel()
         layout.addWidget(self.status_label)
@@ -134,6 +153,31 @@ class VideoAnalyzerUI(QWidget):
         dialog = SettingsWindow(self)
         dialog.exec_()
 
+    def open_live(self):
+        dialog = LiveWindow(self, self.start_live, self.poll_live, self.stop_live)
+        dialog.exec_()
+
+    def start_live(self, path):
+        scale = float(self.scale_display.text())
+        step = self.step_input.value()
+        agitation = self.agitation_input.value()
+        if self.on_live_start:
+            text = self.on_live_start(path, step, scale, agitation)
+            if text:
+                self.video_list.addItem(text)
+
+    def poll_live(self):
+        if self.on_live_poll:
+            return self.on_live_poll()
+        return []
+
+    def stop_live(self):
+        if self.on_live_stop:
+            updated = self.on_live_stop()
+            if updated:
+                row, text = updated
+                self.video_list.item(row).setText(text)
+
     def add_video(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Video", "", "Videos (*.avi *.mp4)")
         if path and self.on_add_video:
@@ -196,7 +240,7 @@ class VideoAnalyzerUI(QWidget):
         if name:
             self.filename_input.setText(f"{name}_{date}.xlsx")
 
-    def start_analysis(self):
+    def start_analysis(self, sweep=False):
         try:
             scale = float(self.scale_display.text())
             step = self.step_input.value()
@@ -206,11 +250,46 @@ class VideoAnalyzerUI(QWidget):
                 raise ValueError("Output filename must end with .xlsx")
 
             if self.on_analyze:
-                path = self.on_analyze(step, scale, filename, agitation)
+                path = self.on_analyze(step, scale, filename, agitation, update=self.update_checkbox.isChecked(),
+                                       progress=self.show_progress, sweep=sweep)
                 self.status_label.setText(f"Saved to: {path}")
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
     
+    def show_progress(self, index, total, video_path):
+        self.status_label.setText(f"Analysing {index + 1}/{total}: {os.path.basename(video_path)}")
+        QApplication.processEvents()
+
+    def select_scale_pixmap(self):
+        # Lit directement une image de la vidéo sélectionnée, sinon demande un fichier image
+        row = self.video_list.currentRow()
+        if row >= 0 and self.on_get_frame:
+            last_frame = max(self.on_frame_count(row) - 1, 0) if self.on_frame_count else 0
+            frame_number, ok = QInputDialog.getInt(self, "Choisir une image", "Numéro de l'image :", 0, 0, last_frame)
+            if not ok:
+                return None
+            try:
+                frame = self.on_get_frame(row, frame_number)
+            except Exception as e:
+                self.status_label.setText(f"Error: {str(e)}")
+                return None
+            if frame is not None:
+                return self.frame_to_pixmap(frame)
+
+        file_path, _ = QFileDialog.getOpenFileName(self, "Choisir une image", "", "Images (*.png *.jpg *.jpeg *.bmp)")
+        if not file_path:
+            return None
+        return QPixmap(file_path)
+
+    def frame_to_pixmap(self, frame):
+        height, width = frame.shape[:2]
+        if frame.ndim == 2:
+            image = QImage(frame.tobytes(), width, height, width, QImage.Format_Grayscale8)
+        else:
+            rgb = frame[:, :, ::-1].copy()
+            image = QImage(rgb.tobytes(), width, height, 3 * width, QImage.Format_RGB888)
+        return QPixmap.fromImage(image.copy())
+
     def open_scale_selector(self):
         class ScaleDialog(QDialog):
             def __init__(dialog_self):
@@ -222,12 +301,12 @@ class VideoAnalyzerUI(QWidget):
                 dialog_self.layout.addWidget(dialog_self.label)
                 dialog_self.setLayout(dialog_self.layout)
 
-                file_path, _ = QFileDialog.getOpenFileName(self, "Choisir une image", "", "Images (*.png *.jpg *.jpeg *.bmp)")
-                if not file_path:
+                pixmap = self.select_scale_pixmap()
+                if pixmap is None:
                     dialog_self.reject()
                     return
 
-                dialog_self.pixmap = QPixmap(file_path)
+                dialog_self.pixmap = pixmap
                 dialog_self.original = dialog_self.pixmap.copy()
                 dialog_self.label.setPixmap(dialog_self.pixmap)
                 dialog_self.label.mousePressEvent = dialog_self.record_click
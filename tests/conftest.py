@@ -0,0 +1,32 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def voronoi_foam(width, height, bubbles, seed=0, film=1):
+    """Synthetic foam: bright Voronoi cells separated by dark films `film` pixels wide."""
+    rng = np.random.default_rng(seed)
+    seeds = np.ones((height, width), dtype=np.uint8)
+    seeds[rng.integers(0, height, bubbles), rng.integers(0, width, bubbles)] = 0
+    _, labels = cv2.distanceTransformWithLabels(seeds, cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL)
+
+    films = np.zeros((height, width), dtype=np.uint8)
+    films[:, :-1] |= labels[:, :-1] != labels[:, 1:]
+    films[:-1, :] |= labels[:-1, :] != labels[1:, :]
+    if film > 1:
+        films = cv2.dilate(films, np.ones((film, film), dtype=np.uint8))
+    gray = np.where(films > 0, 0, 200).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def write_video(path, frames, fps=25):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    return str(path)
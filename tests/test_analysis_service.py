@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+from controller.analysis_service import AnalysisService
+from controller.service_client import AnalysisClient
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = AnalysisService(port=0)
+    submitted = []
+    monkeypatch.setattr(service, "submit", lambda request: submitted.append(request) or len(submitted))
+    thread = threading.Thread(target=service.server.serve_forever, daemon=True)
+    thread.start()
+    yield service, submitted
+    service.server.shutdown()
+    service.server.server_close()
+    service.executor.shutdown(wait=False)
+
+
+def post_job(service, output_filename):
+    host, port = service.server.server_address[:2]
+    connection = HTTPConnection(host, port, timeout=10)
+    body = json.dumps({"cwd": os.getcwd(), "videos": [], "step": 1, "scale": 1.0, "agitation": 0,
+                       "output_filename": output_filename})
+    connection.request("POST", "/jobs", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    status = response.status
+    response.read()
+    connection.close()
+    return status
+
+
+@pytest.mark.parametrize("name", ["../x.xlsx", "sub/x.xlsx", "sub\\x.xlsx", "..", "C:x.xlsx", "", None])
+def test_output_outside_results_is_rejected(service, name):
+    service, submitted = service
+    assert post_job(service, name) == 400
+    assert submitted == []
+
+
+def test_plain_output_name_is_accepted(service):
+    service, submitted = service
+    assert post_job(service, "resultats.xlsx") == 200
+    assert submitted[0]["output_filename"] == "resultats.xlsx"
+
+
+def test_client_reports_rejected_requests(service):
+    service, submitted = service
+    client = AnalysisClient(*service.server.server_address[:2])
+    request = client.build_request({}, 1, 1.0, "../x.xlsx", 0)
+    with pytest.raises(ValueError):
+        client.run(request)
+    assert submitted == []
+
+
+def test_cli_does_not_load_the_analysis_modules():
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    code = "import sys, cli; print(sorted({'cv2', 'pandas', 'openpyxl'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
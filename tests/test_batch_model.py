@@ -0,0 +1,74 @@
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import voronoi_foam, write_video
+from model.batch_model import BatchModel
+from model.export_model import ExportModel
+from model.video_model import VideoModel
+
+
+def test_assembled_workbook_records_sources(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    videos = [write_video(tmp_path / f"foam{i}.avi", [voronoi_foam(160, 120, 20, seed=i, film=3)] * 6)
+              for i in range(2)]
+    batch = BatchModel(str(tmp_path / "jobs.db"), str(tmp_path / "shared"))
+    for video in videos:
+        batch.enqueue(video, None, 2, 1.0, 0)
+    assert batch.run_worker(worker="test") == 2
+
+    batch.assemble("out.xlsx")
+    exporter = ExportModel()
+    sources = exporter.read_sources("out.xlsx")
+    assert [sources[sheet]["video"] for sheet in ("video1", "video2")] == videos
+
+    # An update with the same parameters finds nothing to re-analyse
+    model = VideoModel()
+    for video in videos:
+        model.add_video(video)
+    current = {video: model.source_info(video, 2, 1.0, 0) for video in videos}
+    assert exporter.plan_update("out.xlsx", current) == {}
+
+
+def test_assemble_refuses_unfinished_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    videos = [write_video(tmp_path / f"foam{i}.avi", [voronoi_foam(160, 120, 20, seed=i, film=3)] * 6)
+              for i in range(2)]
+    batch = BatchModel(str(tmp_path / "jobs.db"), str(tmp_path / "shared"))
+    for video in videos:
+        batch.enqueue(video, None, 1, 1.0, 0)
+
+    job = batch.queue.claim("test")
+    result_path, warnings = batch.run_job(job)
+    batch.queue.complete(job["id"], "test", result_path, warnings)
+
+    with pytest.raises(ValueError, match="1 job"):
+        batch.assemble("out.xlsx")
+    batch.assemble("out.xlsx", partial=True)
+    book = pd.read_excel(tmp_path / "results" / "out.xlsx", sheet_name=None)
+    assert [name for name in book if name.startswith("video")] == ["video1"]
+
+
+def test_reference_errors_are_recorded_with_the_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "settings.json").write_text(json.dumps({"columns": {"Capteurs": ["P"], "Debit": ["missing"]}}))
+    with pd.ExcelWriter(tmp_path / "ref.xlsx") as writer:
+        pd.DataFrame({"P": range(6)}).to_excel(writer, sheet_name="Capteurs", index=False)
+        pd.DataFrame({"Q": range(6)}).to_excel(writer, sheet_name="Debit", index=False)
+        pd.DataFrame({"Configuration": ["Débit", "Nom"], "Value": [1.5, "essai"]}).to_excel(
+            writer, sheet_name="Config", index=False)
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20, film=3)] * 6)
+    batch = BatchModel(str(tmp_path / "jobs.db"), str(tmp_path / "shared"))
+    batch.enqueue(video, str(tmp_path / "ref.xlsx"), 1, 1.0, 0)
+    assert batch.run_worker(worker="test") == 1
+
+    job = batch.queue.jobs()[0]
+    assert job["status"] == "done"
+    assert "Debit" in job["warnings"]
+
+    # Results are stored as JSON and the parameters keep their mixed values
+    assert batch.result_path(job["id"]).suffix == ".json"
+    batch.assemble("out.xlsx")
+    params = pd.read_excel(tmp_path / "results" / "out.xlsx", sheet_name="video1_param")
+    assert params["Value"].tolist() == [1.5, "essai"]
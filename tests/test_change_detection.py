@@ -0,0 +1,32 @@
+from conftest import voronoi_foam, write_video
+from processing.image_analyser import binarize_frame, binary_signature, signature_change, analyse_image
+from processing.video_analyser import analyse_video, REUSED_COLUMN
+
+
+def test_different_bubble_counts_are_seen_as_changed():
+    for (width, height), counts in (((640, 480), (200, 120)), ((1920, 1080), (399, 249))):
+        first = voronoi_foam(width, height, counts[0], seed=1, film=2)
+        second = voronoi_foam(width, height, counts[1], seed=2, film=2)
+        assert analyse_image(first)["nb_bulles"] != analyse_image(second)["nb_bulles"]
+
+        change = signature_change(binary_signature(binarize_frame(second).copy()),
+                                  binary_signature(binarize_frame(first).copy()))
+        assert change > 0.01
+
+
+def test_identical_frames_are_unchanged():
+    binary = binarize_frame(voronoi_foam(320, 240, 50)).copy()
+    assert signature_change(binary_signature(binary), binary_signature(binary.copy())) == 0
+
+
+def test_reused_rows_match_a_full_analysis(tmp_path):
+    foams = [voronoi_foam(320, 240, count, seed=count, film=3) for count in (80, 50, 120)]
+    frames = [foams[0], foams[0], foams[1], foams[1], foams[2], foams[2]]
+    video = write_video(tmp_path / "foam.avi", frames)
+
+    gated = analyse_video(video, change_tolerance=0.0001)
+    full = analyse_video(video)
+
+    assert [row["nb_bulles"] for row in gated] == [row["nb_bulles"] for row in full]
+    assert len({row["nb_bulles"] for row in full}) == 3
+    assert [row[REUSED_COLUMN] for row in gated] == [False, False, True, False, True]
@@ -0,0 +1,57 @@
+import json
+
+import pandas as pd
+
+from model.export_model import ExportModel
+
+
+def results(frames):
+    return pd.DataFrame({"frame": frames, "nb_bulles": [3] * len(frames),
+                         "surface_moyenne[mm²]": [1.0] * len(frames), "ecart_type[mm²]": [0.5] * len(frames)})
+
+
+def source(video, excel=None, change_tolerance=None, grayscale=False):
+    return {"video": video, "size": 100, "mtime": 1700000000.123, "excel": excel, "step": 1, "scale": 1.0,
+            "agitation": 0, "change_tolerance": change_tolerance, "grayscale": grayscale,
+            "columns": json.dumps({"Capteurs": ["P"]})}
+
+
+def test_unchanged_sources_are_not_reanalysed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exporter = ExportModel()
+    sources = {"video1.avi": source("/data/video1.avi", excel="/data/ref.xlsx"),
+               "video2.avi": source("/data/video2.avi")}
+    exporter.export_results("out.xlsx", [results([1, 2]), results([1, 2])], [None, None],
+                            sources=list(sources.values()))
+
+    assert exporter.read_sources("out.xlsx")["video2"]["excel"] is None
+    assert exporter.plan_update("out.xlsx", sources) == {}
+
+
+def test_changed_settings_are_reanalysed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exporter = ExportModel()
+    sources = {"video1.avi": source("/data/video1.avi"), "video2.avi": source("/data/video2.avi")}
+    exporter.export_results("out.xlsx", [results([1, 2]), results([1, 2])], [None, None],
+                            sources=list(sources.values()))
+
+    sources["video1.avi"] = source("/data/video1.avi", change_tolerance=0.01)
+    sources["video2.avi"] = source("/data/video2.avi", grayscale=True)
+    sources["video3.avi"] = source("/data/video3.avi")
+    assert exporter.plan_update("out.xlsx", sources) == {"video1.avi": "video1", "video2.avi": "video2",
+                                                         "video3.avi": "video3"}
+
+
+def test_workbook_without_sources_keeps_its_video_sheets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exporter = ExportModel()
+    exporter.export_results("out.xlsx", [results([1, 2]), results([1, 2, 3])], [None, None])
+
+    plan = exporter.plan_update("out.xlsx", {"new.avi": source("/data/new.avi")})
+    assert plan == {"new.avi": "video3"}
+
+    exporter.update_results("out.xlsx", {"video3": (results([5]), None, source("/data/new.avi"))})
+    book = pd.read_excel(tmp_path / "results" / "out.xlsx", sheet_name=None)
+    assert book["video1"]["frame"].tolist() == [1, 2]
+    assert book["video2"]["frame"].tolist() == [1, 2, 3]
+    assert book["video3"]["frame"].tolist() == [5]
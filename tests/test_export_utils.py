@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.chart import ScatterChart
+
+from model.export_model import ExportModel
+from processing.export_utils import CHART_DATA_SHEET, decimate_min_max
+
+
+def frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"nb_bulles": rng.integers(0, 100, n), "surface_moyenne[mm²]": rng.random(n),
+                         "ecart_type[mm²]": rng.random(n), "frame": np.arange(n)})
+
+
+def test_decimation_keeps_extrema():
+    df = frames(30000)
+    decimated = decimate_min_max(df, ["nb_bulles"], 2000)
+    assert len(decimated) <= 2100
+    assert decimated["nb_bulles"].max() == df["nb_bulles"].max()
+    assert decimated["nb_bulles"].min() == df["nb_bulles"].min()
+    assert decimated["frame"].is_monotonic_increasing
+
+
+def test_large_exports_use_decimated_scatter_charts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = ExportModel().export_results("out.xlsx", [frames(5000), frames(5000, seed=1)], [None, None],
+                                        chart_overlay=True)
+
+    workbook = load_workbook(path)
+    charts = workbook["Résumé"]._charts
+    assert len(charts) == 6
+    assert all(isinstance(chart, ScatterChart) for chart in charts)
+    assert workbook[CHART_DATA_SHEET].max_row < 3000
@@ -0,0 +1,74 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import voronoi_foam, write_video
+from processing.frame_index import FrameIndex, read_frame
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = write_video(tmp_path_factory.mktemp("video") / "foam.avi",
+                       [voronoi_foam(160, 120, 10 + i % 30, seed=i, film=3) for i in range(120)])
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return path, frames
+
+
+def test_random_and_sequential_access_match_frames_read_in_order(video, tmp_path):
+    path, frames = video
+    index = FrameIndex.load_or_build(path, cache_dir=str(tmp_path))
+    assert index.frame_count == len(frames)
+    assert len(index.seek_points) > 1
+
+    rng = np.random.default_rng(0)
+    for n in rng.integers(0, len(frames), 40):
+        assert np.array_equal(index.get_frame(int(n)), frames[n])
+    for n in range(len(frames)):
+        assert np.array_equal(index.get_frame(n), frames[n])
+
+    # Frames kept in the cache are returned without decoding again
+    assert index.get_frame(len(frames) - 1) is index.get_frame(len(frames) - 1)
+    with pytest.raises(IndexError):
+        index.get_frame(len(frames))
+    index.close()
+
+
+def test_cached_index_is_invalidated_when_the_video_changes(video, tmp_path):
+    path = str(tmp_path / "copy.avi")
+    with open(video[0], "rb") as src, open(path, "wb") as dst:
+        dst.write(src.read())
+    cache_dir = str(tmp_path / "cache")
+
+    assert FrameIndex.load_cached(path, cache_dir) is None
+    built = FrameIndex.load_or_build(path, cache_dir)
+    cached = FrameIndex.load_cached(path, cache_dir)
+    assert cached is not None and cached.seek_points == built.seek_points
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert FrameIndex.load_cached(path, cache_dir) is None
+
+    FrameIndex.load_or_build(path, cache_dir)
+    assert FrameIndex.load_cached(path, cache_dir) is not None
+    with open(path, "ab") as f:
+        f.write(b"\0" * 16)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert FrameIndex.load_cached(path, cache_dir) is None
+
+
+def test_read_frame_without_index(video):
+    path, frames = video
+    assert np.array_equal(read_frame(path, 0), frames[0])
+    assert np.array_equal(read_frame(path, 77), frames[77])
+    for n in (-1, len(frames)):
+        with pytest.raises(IndexError):
+            read_frame(path, n)
@@ -0,0 +1,63 @@
+import sqlite3
+
+from processing.job_queue import JobQueue
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("/data/video.avi", None, {"step": 1})
+
+    job = queue.claim("a", lease_seconds=-1)
+    assert job["id"] == job_id and job["attempts"] == 1
+    reclaimed = queue.claim("b")
+    assert reclaimed["id"] == job_id and reclaimed["attempts"] == 2
+    assert reclaimed["params"] == {"step": 1}
+
+    # The first worker lost the job: it can neither renew nor complete it
+    assert not queue.renew(job_id, "a")
+    assert queue.renew(job_id, "b")
+    queue.complete(job_id, "a", "/results/a.json")
+    assert queue.jobs()[0]["status"] == "running"
+    queue.complete(job_id, "b", "/results/b.json", ["sheet missing"])
+    assert queue.jobs()[0]["result"] == "/results/b.json"
+    assert queue.jobs()[0]["warnings"] == "sheet missing"
+    assert queue.claim("c") is None
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    job_id = queue.enqueue("/data/video.avi", None, {})
+
+    queue.claim("a")
+    queue.fail(job_id, "a", "decoder crashed")
+    assert queue.jobs()[0]["status"] == "pending"
+
+    queue.claim("b")
+    queue.fail(job_id, "b", "decoder crashed")
+    assert queue.jobs()[0]["status"] == "failed"
+    assert queue.jobs()[0]["error"] == "decoder crashed"
+    assert queue.claim("c") is None
+
+
+def test_expired_lease_at_max_attempts_fails(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1)
+    queue.enqueue("/data/video.avi", None, {})
+    queue.claim("a", lease_seconds=-1)
+    assert queue.claim("b") is None
+    assert queue.counts() == {"failed": 1}
+
+
+def test_database_without_warnings_column_is_migrated(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, video TEXT NOT NULL, excel TEXT, "
+                 "params TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL "
+                 "DEFAULT 0, worker TEXT, lease_until REAL, result TEXT, error TEXT)")
+    conn.execute("INSERT INTO jobs (video, params) VALUES ('/data/video.avi', '{}')")
+    conn.commit()
+    conn.close()
+
+    queue = JobQueue(db_path)
+    job = queue.claim("a")
+    queue.complete(job["id"], "a", "/results/a.json", ["warning"])
+    assert queue.jobs()[0]["warnings"] == "warning"
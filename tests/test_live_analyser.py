@@ -0,0 +1,109 @@
+import time
+
+import cv2
+import numpy as np
+
+import processing.live_analyser as live_analyser
+from conftest import voronoi_foam, write_video
+from processing.live_analyser import LiveAnalyser, VideoFileSource, ImageDirectorySource
+from processing.video_analyser import analyse_video
+
+
+class CountingCapture:
+    """cv2.VideoCapture counting the openings and the frames skipped with grab."""
+    opened = 0
+    grabs = 0
+    capture = cv2.VideoCapture
+
+    def __init__(self, path):
+        CountingCapture.opened += 1
+        self.cap = CountingCapture.capture(path)
+
+    def grab(self):
+        CountingCapture.grabs += 1
+        return self.cap.grab()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def test_growing_file_matches_offline_analysis(tmp_path):
+    frames = [voronoi_foam(160, 120, 10 + i % 15, seed=i, film=3) for i in range(120)]
+    complete = write_video(tmp_path / "complete.avi", frames)
+    data = open(complete, "rb").read()
+
+    growing = tmp_path / "growing.avi"
+    live = LiveAnalyser(str(growing), step=2, agitation=3)
+    chunk = len(data) // 17
+    with open(growing, "wb") as f:
+        for start in range(0, len(data), chunk):
+            f.write(data[start:start + chunk])
+            f.flush()
+            live.poll()
+            live.poll()
+    results = live.finish()
+
+    expected = analyse_video(complete, step=2, agitation=3)
+    assert live.frames_read == 120
+    assert [row["frame"] for row in results] == [row["frame"] for row in expected]
+    assert [row["nb_bulles"] for row in results] == [row["nb_bulles"] for row in expected]
+
+
+def test_complete_file_is_read_once(tmp_path):
+    frames = [voronoi_foam(160, 120, 20, seed=i, film=3) for i in range(30)]
+    video = write_video(tmp_path / "video.avi", frames)
+    live = LiveAnalyser(video)
+    for _ in range(10):
+        live.poll()
+    assert [row["frame"] for row in live.finish()] == list(range(1, 30))
+
+
+def test_one_poll_reads_within_a_time_budget(tmp_path):
+    frames = [voronoi_foam(160, 120, 20, seed=i, film=3) for i in range(30)]
+    video = write_video(tmp_path / "video.avi", frames)
+    live = LiveAnalyser(video, time_budget=10)
+    live.poll()
+    assert live.frames_read == 29
+
+
+def test_unchanged_file_is_not_reopened_and_resumes_by_seeking(tmp_path, monkeypatch):
+    frames = [voronoi_foam(160, 120, 20, seed=i, film=3) for i in range(60)]
+    video = write_video(tmp_path / "video.avi", frames)
+    monkeypatch.setattr(CountingCapture, "opened", 0)
+    monkeypatch.setattr(CountingCapture, "grabs", 0)
+    monkeypatch.setattr(live_analyser.cv2, "VideoCapture", CountingCapture)
+
+    source = VideoFileSource(video)
+    first = source.read_new(100)
+    for _ in range(5):
+        assert source.read_new(100) == []
+    assert CountingCapture.opened == 1
+
+    # The file grew: it is reopened at the last frame read instead of decoded from the start
+    source._size = None
+    last = source.read_new(100, final=True)
+    assert CountingCapture.opened == 2
+    assert CountingCapture.grabs == 0
+    assert [index for index, _ in first + last] == list(range(60))
+
+
+def test_image_directory_is_read_in_natural_order(tmp_path):
+    for i in (1, 2, 10, 11):
+        cv2.imwrite(str(tmp_path / f"img{i}.png"), np.full((8, 8, 3), i, dtype=np.uint8))
+    frames = ImageDirectorySource(str(tmp_path), settle_time=0).read_new(10)
+    assert [int(frame[0, 0, 0]) for _, frame in frames] == [1, 2, 10, 11]
+
+
+def test_background_follow(tmp_path):
+    frames = [voronoi_foam(160, 120, 20, seed=i, film=3) for i in range(30)]
+    video = write_video(tmp_path / "video.avi", frames)
+    live = LiveAnalyser(video)
+    live.start(interval=0.01)
+    shown = []
+    deadline = time.time() + 30
+    while len(shown) < 28 and time.time() < deadline:
+        shown += live.take_new_results()
+        time.sleep(0.01)
+    results = live.finish()
+    assert [row["frame"] for row in shown] == list(range(1, 29))
+    assert [row["frame"] for row in results] == list(range(1, 30))
@@ -0,0 +1,44 @@
+import cv2
+import pytest
+
+import processing.video_analyser as video_analyser
+from conftest import voronoi_foam, write_video
+from processing.video_analyser import analyse_video, analyse_video_sweep
+
+
+class FailingCapture:
+    """Capture whose decoder fails after a few frames."""
+
+    def __init__(self, path, fail_after):
+        self.cap = cv2.VideoCapture(path)
+        self.left = fail_after
+
+    def read(self, image=None):
+        if self.left == 0:
+            raise RuntimeError("decoder failure")
+        self.left -= 1
+        return self.cap.read(image)
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def test_sweep_matches_single_threshold_runs(tmp_path):
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20 + i, seed=i, film=3) for i in range(12)])
+    sweep = analyse_video_sweep(video, [1, 100, "otsu"], step=2)
+    assert sweep["1"] == analyse_video(video, step=2)
+    assert sweep["100"] == analyse_video(video, step=2, threshold=100)
+    assert sweep["otsu"] == analyse_video(video, step=2, threshold="otsu")
+
+
+def test_pipelined_matches_sequential(tmp_path):
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20 + i, seed=i, film=3) for i in range(30)])
+    assert analyse_video(video, workers=3, queue_size=2) == analyse_video(video)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_decoder_failure_is_raised(tmp_path, monkeypatch, workers):
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20, seed=i, film=3) for i in range(30)])
+    monkeypatch.setattr(video_analyser, "open_capture", lambda path, **kwargs: FailingCapture(path, 10))
+    with pytest.raises(RuntimeError, match="decoder failure"):
+        analyse_video(video, workers=workers, queue_size=2)
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import processing.video_capture as video_capture
+from conftest import voronoi_foam, write_video
+from processing.video_capture import resolve_decode_options, open_capture, DECODE_CACHE_FILE
+
+CHOICE = {"backend": "auto", "threads": 1, "grayscale": True}
+
+
+def count_self_tests(monkeypatch):
+    calls = []
+
+    def select(video_path, thresholds=()):
+        calls.append(list(thresholds))
+        return dict(CHOICE)
+
+    monkeypatch.setattr(video_capture, "select_decode_options", select)
+    return calls
+
+
+def test_settings_are_used_without_self_test(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = count_self_tests(monkeypatch)
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20)] * 3)
+
+    decode = resolve_decode_options(video, {"threads": 2, "grayscale": True})
+    assert decode == {"backend": "auto", "threads": 2, "grayscale": True}
+    assert calls == []
+    assert not os.path.exists(DECODE_CACHE_FILE)
+
+
+def test_self_test_is_cached_per_file_and_thresholds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = count_self_tests(monkeypatch)
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20)] * 3)
+
+    assert resolve_decode_options(video, {"self_test": True}) == CHOICE
+    assert resolve_decode_options(video, {"self_test": True}) == CHOICE
+    assert len(calls) == 1
+    with open(DECODE_CACHE_FILE, encoding="utf-8") as f:
+        assert json.load(f)[os.path.abspath(video)]["decode"] == CHOICE
+
+    # Other thresholds: the luma check must be redone
+    resolve_decode_options(video, {"self_test": True}, thresholds=[1, "otsu"])
+    assert calls[-1] == [1, "otsu"]
+    resolve_decode_options(video, {"self_test": True}, thresholds=[1, "otsu"])
+    assert len(calls) == 2
+
+    # Modified video
+    stat = os.stat(video)
+    os.utime(video, (stat.st_atime, stat.st_mtime + 10))
+    resolve_decode_options(video, {"self_test": True})
+    assert len(calls) == 3
+
+
+def test_unusable_backend_falls_back_to_defaults(tmp_path, monkeypatch):
+    video = write_video(tmp_path / "foam.avi", [voronoi_foam(160, 120, 20, seed=i) for i in range(3)])
+    expected = cv2.VideoCapture(video).read()[1]
+    monkeypatch.setattr(video_capture, "_open", lambda video_path, backend, threads: cv2.VideoCapture())
+
+    cap = open_capture(video, backend="gstreamer", threads=4)
+    assert cap.isOpened()
+    ret, frame = cap.read()
+    cap.release()
+    assert ret and np.array_equal(frame, expected)
+
+
+def test_concurrent_cache_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    errors = []
+
+    def write(worker):
+        try:
+            for i in range(50):
+                video_capture._save_decode_cache({f"video{worker}": {"decode": CHOICE, "i": i}})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with open(DECODE_CACHE_FILE, encoding="utf-8") as f:
+        assert len(json.load(f)) == 1
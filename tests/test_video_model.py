@@ -0,0 +1,48 @@
+import pandas as pd
+
+import model.video_model as video_model
+from model.video_model import VideoModel, REFERENCE_PREFETCH
+
+
+def test_reference_files_are_read_a_bounded_distance_ahead(monkeypatch):
+    read = []
+    read_when_analysed = []
+
+    def fake_analyse_video(video_path, **kwargs):
+        read_when_analysed.append(len(read))
+        return [{"frame": 1, "nb_bulles": 3}]
+
+    def fake_read_reference(excel_path):
+        read.append(excel_path)
+        return {"Capteurs": pd.DataFrame({"P": [0.0, 1.0]})}, pd.DataFrame(), []
+
+    monkeypatch.setattr(video_model, "analyse_video", fake_analyse_video)
+    model = VideoModel(columns={})
+    monkeypatch.setattr(model, "_read_reference", fake_read_reference)
+    videos = [f"video{i}.avi" for i in range(6)]
+    for i, video in enumerate(videos):
+        model.videos_data[video] = {"frame": 2, "excel": f"ref{i}.xlsx"}
+
+    data_frames, _ = model.analyze_all(1, 1.0, 0)
+
+    assert len(data_frames) == len(videos)
+    assert all(df["P"].tolist() == [1.0] for df in data_frames)
+    # Reads run in the background: only an upper bound holds while a video is analysed
+    assert all(count <= index + REFERENCE_PREFETCH + 1 for index, count in enumerate(read_when_analysed))
+
+
+def test_unreadable_parameters_keep_the_frame_data(tmp_path, monkeypatch):
+    excel_path = tmp_path / "ref.xlsx"
+    with pd.ExcelWriter(excel_path) as writer:
+        pd.DataFrame({"P": [0.0, 1.0, 2.0]}).to_excel(writer, sheet_name="Capteurs", index=False)
+        pd.DataFrame({"a": [1], "b": [2], "c": [3]}).to_excel(writer, sheet_name="Config", index=False)
+
+    monkeypatch.setattr(video_model, "analyse_video", lambda video_path, **kwargs: [{"frame": 2, "nb_bulles": 3}])
+    model = VideoModel(columns={"Capteurs": ["P"]})
+    model.videos_data["video.avi"] = {"frame": 3, "excel": str(excel_path)}
+
+    data_frames, param_excels = model.analyze_all(1, 1.0, 0)
+
+    assert data_frames[0]["P"].tolist() == [2.0]
+    assert param_excels == [None]
+    assert "Config" in model.reference_errors["video.avi"][0]